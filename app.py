@@ -1,21 +1,43 @@
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, jsonify, request, make_response, Response, stream_with_context
 from flask_cors import CORS
-from search import search_journals, test_query, get_all_years, get_volume_sets
-from results import get_pages_by_ids, get_adjacent_page
+from search import date_histogram, multi_search, search_facets, search_journals, test_query
+from catalog import get_all_years, get_volume_sets
+from results import get_pages_by_ids, get_adjacent_page, get_page_window
 from projects import (
     get_all_projects,
     update_project,
+    update_project_pages,
     get_project,
     create_project,
     delete_project,
     get_page,
     update_page_metadata,
+    bulk_update_page_metadata,
+    bulk_update_page_metadata_by_filter,
     update_project_page_metadata,
     get_project_data_for_export,
+    get_project_export_stream,
+    get_page_passages_in_projects,
 )
+from indexes import ensure_indexes
+from etags import (
+    CATALOG_CACHE_CONTROL,
+    PAGE_CACHE_CONTROL,
+    PROJECT_CACHE_CONTROL,
+    catalog_etag,
+    conditional_json,
+    page_etag,
+    pages_etag,
+    project_etag,
+)
+import json_provider
+import metrics
+import tracing
 import csv
 import io
 import json
+import os
+import re
 
 # Helper function to format collection name (e.g. "parliamentary proceedings" -> "Parliamentary Proceedings")
 def formatCollectionName(volume_set):
@@ -25,21 +47,91 @@ def formatCollectionName(volume_set):
     # Capitalize first letter of each word 
     return volume_set.title()
 
+# Header row for project CSV exports, with a Passage/Notes column pair per passage
+def export_csv_header(max_passages):
+    header = [
+        "Database",
+        "Volume", 
+        "Page Number", 
+        "Date", 
+        "Topics", 
+        "Text", 
+        "Keywords",
+        "Page Notes"
+    ]
+
+    # Add passage and note columns for each potential passage
+    for i in range(1, max_passages + 1):
+        header.append(f"Passage{i}")
+        header.append(f"Notes{i}")
+
+    return header
+
+
+# One CSV row per page, with each passage and its note in separate columns
+def export_csv_row(page, max_passages):
+    row_data = [
+        formatCollectionName(page.get("volume_set", "")),
+        page.get("volume_title", ""),
+        page.get("page_number", ""),
+        page.get("date", ""),
+        "; ".join(page.get("topics", [])),
+        # Sanitize text fields to avoid CSV formatting issues
+        (page.get("text", "") or "").replace("\n", " ").replace("\r", ""),
+        page.get("keywords", ""),
+        (page.get("page_notes", "") or "").replace("\n", " ").replace("\r", "")
+    ]
+
+    passages = page.get("passages", [])
+    passage_notes = page.get("passage_notes", {})
+
+    # Fill in passage columns
+    for i in range(max_passages):
+        if i < len(passages):
+            passage = passages[i]
+            passage_id = passage.get("id", "")
+            passage_text = passage.get("text", "").replace("\n", " ").replace("\r", "")
+            passage_note = passage_notes.get(passage_id, "").replace("\n", " ").replace("\r", "")
+
+            row_data.append(passage_text)
+            row_data.append(passage_note)
+        else:
+            # Empty cells for missing passages
+            row_data.append("")
+            row_data.append("")
+
+    return row_data
+
+
 app = Flask(__name__)
+json_provider.init_app(app)
+metrics.init_app(app)
+tracing.init_app(app)
+
+# Optionally create any missing indexes when the app starts (idempotent)
+if os.environ.get("ENSURE_INDEXES_ON_STARTUP") == "1":
+    print(f"Ensured indexes: {ensure_indexes()}")
+
 # Configure CORS properly to allow all origins, methods, and headers
+# (asgi.py applies the same settings to its async routes)
+CORS_ORIGINS = [
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "https://react-fe-2xnv.onrender.com",
+]
+CORS_METHODS = ["GET", "POST", "OPTIONS", "DELETE", "PUT", "PATCH"]
+CORS_ALLOW_HEADERS = ["Content-Type", "Authorization", "X-Requested-With", "If-None-Match"]
+CORS_EXPOSE_HEADERS = ["Content-Type", "X-Total-Count", "Content-Disposition", "ETag"]
+
 CORS(
     app,
     supports_credentials=True,
-    origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "https://react-fe-2xnv.onrender.com",
-    ],
-    methods=["GET", "POST", "OPTIONS", "DELETE", "PUT", "PATCH"],
-    allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-    expose_headers=["Content-Type", "X-Total-Count"],
+    origins=CORS_ORIGINS,
+    methods=CORS_METHODS,
+    allow_headers=CORS_ALLOW_HEADERS,
+    expose_headers=CORS_EXPOSE_HEADERS,
     vary_header=True,
 )
 
@@ -60,7 +152,29 @@ def api_get_page():
         if not data:
             return {"error": "No JSON data found"}, 400
 
-        return jsonify({"page": get_page(data)})
+        page = get_page(data)
+        if page is None:
+            return {"error": "Page not found"}, 404
+
+        return jsonify({"page": page})
+
+    except Exception as e:
+        return {"error": str(e)}, 400
+
+
+# Cacheable variant: GET /api/page/get?_id=... answers 304 while the page is unchanged
+@app.route("/api/page/get", methods=["GET"])
+def api_get_page_conditional():
+    try:
+        page_id = request.args.get("_id")
+        if not page_id:
+            return {"error": "No page ID provided"}, 400
+
+        etag = page_etag(page_id)
+        if etag is None:
+            return {"error": "Page not found"}, 404
+
+        return conditional_json(etag, lambda: {"page": get_page({"_id": page_id})}, PAGE_CACHE_CONTROL)
 
     except Exception as e:
         return {"error": str(e)}, 400
@@ -106,39 +220,142 @@ def test_post():
 #     return response
 
 
+def search_arguments(data):
+    """Map the frontend's search filter names onto search_journals arguments."""
+    return {
+        "volume": data.get("volume", []),
+        "page_numbers": data.get("pageNumber", []),
+        "dates": data.get("date", []),
+        "topics": data.get("topics", []),
+        "keywords": data.get("keywords", []),
+        "year": data.get("year"),
+        "volume_set": data.get("volume_set", "parliamentary proceedings"),
+        "limit": data.get("limit"),
+        "cursor": data.get("cursor"),
+        "snippets": bool(data.get("snippets", False)),
+        "count_mode": data.get("count_mode"),
+    }
+
+
+# Frontend filter names a bulk update may use, and the search argument each maps to
+FILTER_ARGUMENTS = {
+    "volume": "volume",
+    "pageNumber": "page_numbers",
+    "date": "dates",
+    "topics": "topics",
+    "keywords": "keywords",
+    "year": "year",
+    "volume_set": "volume_set",
+}
+
+
+def filter_arguments(data):
+    """Map a frontend search filter onto build_search_query arguments, rejecting unknown names."""
+    if not isinstance(data, dict):
+        raise ValueError("Filter must be an object of search filters")
+    unknown = set(data) - set(FILTER_ARGUMENTS)
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+    arguments = search_arguments(data)
+    return {name: arguments[name] for name in FILTER_ARGUMENTS.values()}
+
+
 @app.route("/api/search", methods=["POST"])
 def search():
     try:
-        # print("Request headers:", dict(request.headers))
-        # Debugging: Log when the search method is called
-        print("Search method called")
-        # Debugging: Log the incoming request data
         data = request.get_json()
-        print("Received data:", data)
-
-        results = search_journals(
-            volume=data.get("volume", []),
-            page_numbers=data.get("pageNumber", []),
-            dates=data.get("date", []),
-            topics=data.get("topics", []),
-            keywords=data.get("keywords", []),
-            year=data.get("year"),
-            volume_set=data.get("volume_set", "parliamentary proceedings"),
-        )
+
+        results = search_journals(**search_arguments(data))
 
         response = jsonify({"results": results})
         response.headers.add("Access-Control-Allow-Origin", "*")
         return response
+    except ValueError as e:
+        # Bad limit or cursor supplied by the client
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Debugging: Log any exceptions
         print("Error occurred:", str(e))
         return jsonify({"error": str(e)}), 500
 
 
+# Compare several filter sets side by side in one pass over the pages
+@app.route("/api/search/multi", methods=["POST"])
+def search_multi():
+    try:
+        data = request.get_json() or {}
+        searches = data.get("searches")
+
+        if not isinstance(searches, list) or not searches:
+            return jsonify({"error": "No searches provided"}), 400
+        if not all(isinstance(filters, dict) for filters in searches):
+            return jsonify({"error": "Each search must be an object of filters"}), 400
+
+        results = multi_search([search_arguments(filters) for filters in searches])
+        return jsonify({"results": results})
+    except ValueError as e:
+        # Too many searches or results, or a bad limit, cursor or count_mode in one of them
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error occurred:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+# Page counts per year, month or day for the current search filters
+@app.route("/api/search/date-histogram", methods=["POST"])
+def search_date_histogram():
+    try:
+        data = request.get_json() or {}
+        filters = search_arguments(data)
+
+        histogram = date_histogram(
+            volume=filters["volume"],
+            page_numbers=filters["page_numbers"],
+            dates=filters["dates"],
+            topics=filters["topics"],
+            keywords=filters["keywords"],
+            year=filters["year"],
+            volume_set=filters["volume_set"],
+            interval=data.get("interval", "year"),
+        )
+        return jsonify(histogram)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error occurred:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+# Hit counts per volume set, volume, year, topic and date bucket, so the UI
+# can show what each refinement of the current filters would return
+@app.route("/api/search/facets", methods=["POST"])
+def search_facets_endpoint():
+    try:
+        data = request.get_json() or {}
+        filters = search_arguments(data)
+
+        facets = search_facets(
+            volume=filters["volume"],
+            page_numbers=filters["page_numbers"],
+            dates=filters["dates"],
+            topics=filters["topics"],
+            keywords=filters["keywords"],
+            year=filters["year"],
+            volume_set=filters["volume_set"],
+            date_interval=data.get("date_interval", "year"),
+            facet_limit=data.get("facet_limit"),
+        )
+        return jsonify({"facets": facets})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error occurred:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/results", methods=["POST"])
 def get_results():
     try:
-        print("Results endpoint called")
         data = request.get_json()
         page_ids = data.get("page_ids", [])
 
@@ -152,14 +369,29 @@ def get_results():
         return jsonify({"error": str(e)}), 500
 
 
+# Cacheable variant: GET /api/results?page_ids=id1,id2,...
+@app.route("/api/results", methods=["GET"])
+def get_results_conditional():
+    try:
+        page_ids = [page_id for page_id in request.args.get("page_ids", "").split(",") if page_id]
+
+        if not page_ids:
+            return jsonify({"error": "No page IDs provided"}), 400
+
+        return conditional_json(
+            pages_etag(page_ids), lambda: {"results": get_pages_by_ids(page_ids)}, PAGE_CACHE_CONTROL
+        )
+    except Exception as e:
+        print("Error occurred:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/years", methods=["GET"])
 def get_available_years():
     try:
-        # Get all years and ranges from the database
-        year_data = get_all_years()
-
-        # Simply return the data - CORS is handled by the global CORS middleware
-        return jsonify(year_data)
+        # Get all years and ranges from the catalog, unless the client has them
+        # already - CORS is handled by the global CORS middleware
+        return conditional_json(catalog_etag("years"), get_all_years, CATALOG_CACHE_CONTROL)
     except Exception as e:
         print("Error fetching years:", str(e))
         return jsonify({"error": str(e)}), 500
@@ -187,6 +419,24 @@ def api_get_project():
         return {"error": str(e)}, 400
 
 
+# Cacheable variant: GET /api/project?_id=...&page_offset=...&page_limit=...&page_sort=...
+@app.route("/api/project", methods=["GET"])
+def api_get_project_conditional():
+    try:
+        data = request.args.to_dict()
+        if not data.get("_id"):
+            return {"error": "No project ID provided"}, 400
+
+        etag = project_etag(data["_id"])
+        if etag is None:
+            return {"error": "No project found"}, 404
+
+        return conditional_json(etag, lambda: {"project": get_project(data)}, PROJECT_CACHE_CONTROL)
+
+    except Exception as e:
+        return {"error": str(e)}, 400
+
+
 @app.route("/api/project/update", methods=["post"])
 def api_create_project():
     try:
@@ -200,6 +450,26 @@ def api_create_project():
         return {"error": str(e)}, 400
 
 
+# Add, remove or reorder a project's pages and edit single pages' keywords,
+# sending only the change rather than the whole project
+@app.route("/api/project/pages/update", methods=["POST"])
+def api_update_project_pages():
+    try:
+        data = request.get_json()
+        if not data or "_id" not in data:
+            return {"error": "No project ID provided"}, 400
+
+        result = update_project_pages(data["_id"], data)
+        if result is None:
+            return {"error": "No project found"}, 404
+
+        return jsonify({"success": True, **result})
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
 @app.route("/api/page/adjacent", methods=["POST", "OPTIONS"])
 def get_adjacent_page_endpoint():
     # Handle OPTIONS request (preflight)
@@ -231,6 +501,28 @@ def get_adjacent_page_endpoint():
         return jsonify({"error": str(e)}), 500
 
 
+# Get a page with its neighbours so the reader can turn pages without waiting
+@app.route("/api/page/window", methods=["POST"])
+def get_page_window_endpoint():
+    try:
+        data = request.get_json()
+        page_id = data.get("page_id") if data else None
+        
+        if not page_id:
+            return jsonify({"error": "No page ID provided"}), 400
+            
+        window = get_page_window(page_id, data.get("before", 2), data.get("after", 2))
+        
+        if not window:
+            return jsonify({"error": "Page not found"}), 404
+            
+        return jsonify(window)
+        
+    except Exception as e:
+        print(f"Error getting page window: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 # added delete project
 @app.route("/api/project/delete", methods=["POST", "OPTIONS"])
 def api_project_delete():
@@ -269,6 +561,27 @@ def api_update_page_metadata():
         return {"error": str(e)}, 500
 
 
+# Tag dates and topics on many pages at once: either a list of
+# {"page_id", "metadata"} items, or a search "filter" plus one "metadata" patch
+@app.route("/api/page/metadata/bulk-update", methods=["POST"])
+def api_bulk_update_page_metadata():
+    try:
+        data = request.get_json()
+        if not data or ("items" in data) == ("filter" in data):
+            return {"error": "Provide either items or filter and metadata"}, 400
+
+        if "items" in data:
+            result = bulk_update_page_metadata(data["items"])
+        else:
+            result = bulk_update_page_metadata_by_filter(filter_arguments(data["filter"]), data.get("metadata"))
+
+        return {"success": True, **result}, 200
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
 # Add an endpoint to update project-specific page metadata
 @app.route("/api/project/page/metadata/update", methods=["POST"])
 def api_update_project_page_metadata():
@@ -281,11 +594,15 @@ def api_update_project_page_metadata():
         page_id = data["page_id"]
         metadata = data["metadata"]
         
-        success = update_project_page_metadata(project_id, page_id, metadata)
-        if not success:
+        updated = update_project_page_metadata(project_id, page_id, metadata)
+        if updated is None:
             return {"error": "Failed to update project page metadata"}, 500
             
-        return {"success": True, "message": "Project page metadata updated successfully"}, 200
+        return {
+            "success": True,
+            "message": "Project page metadata updated successfully",
+            "metadata": updated,
+        }, 200
     except Exception as e:
         return {"error": str(e)}, 500
 
@@ -302,19 +619,17 @@ def api_export_project_to_csv():
         return response
         
     try:
-        print("Export to CSV endpoint called")
         data = request.get_json()
-        print(f"Request data: {data}")
         
         if not data or "project_id" not in data:
-            print("Invalid request data - project_id missing")
             return {"error": "Invalid request data"}, 400
         
         project_id = data["project_id"]
-        print(f"Exporting project: {project_id}")
+        tracing.set_attribute("project_id", project_id)
         
         # Get project data including all metadata
-        project_data = get_project_data_for_export(project_id)
+        with tracing.span("fetch pages"):
+            project_data = get_project_data_for_export(project_id)
         if not project_data:
             print(f"Project data not found for ID: {project_id}")
             return {"error": "Project not found or error retrieving data"}, 404
@@ -323,85 +638,38 @@ def api_export_project_to_csv():
         output = io.StringIO()
         writer = csv.writer(output)
         
-        # Write CSV header with separate columns for passages and notes
-        header = [
-            "Database",
-            "Volume", 
-            "Page Number", 
-            "Date", 
-            "Topics", 
-            "Text", 
-            "Keywords",
-            "Page Notes"
-        ]
-        
-        # Find the maximum number of passages across all pages to determine column count
-        max_passages = 0
-        for page in project_data["pages"]:
-            num_passages = len(page.get("passages", []))
-            if num_passages > max_passages:
-                max_passages = num_passages
+        with tracing.span("build rows") as build_span:
+            # Find the maximum number of passages across all pages to determine column count
+            max_passages = 0
+            for page in project_data["pages"]:
+                num_passages = len(page.get("passages", []))
+                if num_passages > max_passages:
+                    max_passages = num_passages
         
-        # Add passage and note columns for each potential passage
-        for i in range(1, max_passages + 1):
-            header.append(f"Passage{i}")
-            header.append(f"Notes{i}")
-            
-        writer.writerow(header)
+            writer.writerow(export_csv_header(max_passages))
         
-        # Sort pages by page number (numerically)
-        sorted_pages = sorted(project_data["pages"], 
-                            key=lambda x: int(x["page_number"]) if x["page_number"].isdigit() else 0)
+            # Sort pages by page number (numerically)
+            sorted_pages = sorted(project_data["pages"], 
+                                key=lambda x: int(x["page_number"]) if x["page_number"].isdigit() else 0)
         
-        # Write data for each page (one row per page)
-        page_count = 0
-        for page in sorted_pages:
-            try:
-                # Prepare the row data
-                row_data = [
-                    formatCollectionName(page.get("volume_set", "")),
-                    page.get("volume_title", ""),
-                    page.get("page_number", ""),
-                    page.get("date", ""),
-                    "; ".join(page.get("topics", [])),
-                    # Sanitize text fields to avoid CSV formatting issues
-                    (page.get("text", "") or "").replace("\n", " ").replace("\r", ""),
-                    page.get("keywords", ""),
-                    (page.get("page_notes", "") or "").replace("\n", " ").replace("\r", "")
-                ]
-                
-                # Add each passage and its note as separate columns
-                passages = page.get("passages", [])
-                passage_notes = page.get("passage_notes", {})
-                
-                # Fill in passage columns
-                for i in range(max_passages):
-                    if i < len(passages):
-                        passage = passages[i]
-                        passage_id = passage.get("id", "")
-                        passage_text = passage.get("text", "").replace("\n", " ").replace("\r", "")
-                        passage_note = passage_notes.get(passage_id, "").replace("\n", " ").replace("\r", "")
-                        
-                        row_data.append(passage_text)
-                        row_data.append(passage_note)
-                    else:
-                        # Empty cells for missing passages
-                        row_data.append("")
-                        row_data.append("")
-                
-                writer.writerow(row_data)
-                page_count += 1
+            # Write data for each page (one row per page)
+            page_count = 0
+            for page in sorted_pages:
+                try:
+                    writer.writerow(export_csv_row(page, max_passages))
+                    page_count += 1
                 
-            except Exception as e:
-                print(f"Error processing page: {e}")
-                continue
-        
+                except Exception as e:
+                    print(f"Error processing page: {e}")
+                    continue
+
+            if build_span:
+                build_span.set_attribute("rows", page_count)
+
         # Get the CSV string
         csv_data = output.getvalue()
         output.close()
         
-        print(f"CSV export successful with {page_count} rows generated")
-        
         return jsonify({
             "success": True,
             "csv_data": csv_data,
@@ -416,6 +684,64 @@ def api_export_project_to_csv():
         return {"error": str(e)}, 500
 
 
+# Flush streamed CSV output to the client in chunks of roughly this many characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+# Stream a project export as a CSV download instead of a JSON-wrapped string
+@app.route("/api/project/export/csv/stream", methods=["GET", "POST"])
+def api_stream_project_csv():
+    try:
+        if request.method == "GET":
+            project_id = request.args.get("project_id")
+        else:
+            project_id = (request.get_json(silent=True) or {}).get("project_id")
+
+        if not project_id:
+            return {"error": "Invalid request data"}, 400
+
+        tracing.set_attribute("project_id", project_id)
+        export = get_project_export_stream(project_id)
+        if not export:
+            return {"error": "Project not found or error retrieving data"}, 404
+
+        def generate():
+            output = io.StringIO()
+            writer = csv.writer(output)
+
+            def flush():
+                chunk = output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+                return chunk
+
+            with tracing.span("build rows") as build_span:
+                writer.writerow(export_csv_header(export["max_passages"]))
+
+                rows = 0
+                for page in export["pages"]:
+                    writer.writerow(export_csv_row(page, export["max_passages"]))
+                    rows += 1
+                    if output.tell() >= EXPORT_CHUNK_SIZE:
+                        yield flush()
+
+                yield flush()
+
+                if build_span:
+                    build_span.set_attribute("rows", rows)
+
+        filename = re.sub(r"[^\w\- ]", "_", export["project_title"] or "project")
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}_export.csv"'},
+        )
+
+    except Exception as e:
+        print(f"Error streaming project export: {e}")
+        return {"error": str(e)}, 500
+
+
 @app.route("/api/page/passages/all-projects", methods=["POST"])
 def api_get_page_passages_all_projects():
     try:
@@ -426,35 +752,16 @@ def api_get_page_passages_all_projects():
         page_id = data["page_id"]
         current_project_id = data.get("current_project_id", None)
         
-        # Get all projects that include this page
-        all_projects = get_all_projects()
-        projects_with_page = []
-        
-        for project in all_projects:
-            # Skip the current project if specified
-            if current_project_id and project["_id"] == current_project_id:
-                continue
-                
-            # Check if the page is in this project
-            if page_id in project.get("pages", []):
-                # Get page metadata from this project
-                if "page_metadata" in project and page_id in project["page_metadata"]:
-                    metadata = project["page_metadata"][page_id]
-                    
-                    # Extract passage data only
-                    if "passages" in metadata and metadata["passages"]:
-                        projects_with_page.append({
-                            "project_id": project["_id"],
-                            "project_title": project.get("title", f"Project {project['_id'][-6:]}"),
-                            "passages": metadata["passages"],
-                            "passage_notes": metadata.get("passage_notes", {})
-                        })
+        # Get the passages from every other project that includes this page
+        projects_with_page = get_page_passages_in_projects(page_id, current_project_id)
         
         return jsonify({
             "success": True,
             "projects": projects_with_page
         })
         
+    except ValueError as e:
+        return {"error": str(e)}, 400
     except Exception as e:
         print(f"Error getting passage data: {e}")
         return {"error": str(e)}, 500
@@ -464,8 +771,9 @@ def api_get_page_passages_all_projects():
 def get_available_volume_sets():
     try:
         # Get all volume sets available in the database
-        volume_sets = get_volume_sets()
-        return jsonify({"volume_sets": volume_sets})
+        return conditional_json(
+            catalog_etag("volume-sets"), lambda: {"volume_sets": get_volume_sets()}, CATALOG_CACHE_CONTROL
+        )
     except Exception as e:
         print("Error fetching volume sets:", str(e))
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,281 @@
+"""
+ASGI entry point serving the same API from an asyncio event loop.
+
+    uvicorn asgi:application --workers 4
+
+The POST read endpoints that carry most of the traffic (search, results,
+page reads, reader windows and project windows) are async Quart handlers on
+pymongo's AsyncMongoClient, so one worker keeps thousands of requests in
+flight without a thread for each. Every other route (writes, exports,
+/metrics, the catalog and the ETag-aware GET variants) is the Flask app from
+app.py, run on a thread pool through asgiref's WsgiToAsgi, so both servers
+expose exactly the same URLs.
+
+Volume manifests are an in-memory cache shared with the Flask app; the
+rare call that has to load one runs in a worker thread rather than on the
+event loop.
+"""
+
+import asyncio
+
+from asgiref.wsgi import WsgiToAsgi
+from bson.objectid import ObjectId
+from quart import Quart, jsonify, request
+from quart_cors import cors
+
+import json_provider
+from app import CORS_ALLOW_HEADERS, CORS_EXPOSE_HEADERS, CORS_METHODS, CORS_ORIGINS, search_arguments
+from app import app as flask_app
+from cache import cache_key, search_cache
+from db import get_async_db
+from manifest import adjacent_page_id, window_page_ids
+from projects import (
+    PROJECT_WINDOW_PROJECTION,
+    add_page_docs,
+    page_annotations_projection,
+    project_pages_pipeline,
+    project_window,
+    project_window_ids,
+)
+from results import MAX_WINDOW_PAGES
+from search import (
+    PAGE_PROJECTION,
+    add_match_offsets,
+    build_search_query,
+    check_count_mode,
+    clamp_limit,
+    decode_cursor,
+    fetch_page_pipeline,
+    page_from_facets,
+    search_cache_params,
+    snippet_projection,
+)
+
+quart_app = Quart(__name__)
+json_provider.init_app(quart_app)
+quart_app = cors(
+    quart_app,
+    allow_origin=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=CORS_METHODS,
+    allow_headers=CORS_ALLOW_HEADERS,
+    expose_headers=CORS_EXPOSE_HEADERS,
+)
+
+EMPTY_SEARCH = {"count": 0, "count_exact": True, "results": [], "next_cursor": None}
+
+
+async def search_journals_async(
+    volume=None,
+    page_numbers=None,
+    dates=None,
+    topics=None,
+    keywords=None,
+    year=None,
+    volume_set="parliamentary proceedings",
+    limit=None,
+    cursor=None,
+    snippets=False,
+    count_mode=None,
+) -> dict:
+    """search_journals on the async client, sharing its query, pipeline and cache."""
+    limit = clamp_limit(limit)
+    after = decode_cursor(cursor) if cursor else None
+    count_mode = check_count_mode(count_mode)
+    projection = snippet_projection(keywords) if snippets else None
+
+    async def run():
+        query = build_search_query(volume, page_numbers, dates, topics, keywords, year, volume_set)
+        if query is None:
+            return dict(EMPTY_SEARCH)
+
+        pipeline = fetch_page_pipeline(query, limit, after, projection, count_mode)
+        facets = await (await get_async_db()["pages"].aggregate(pipeline, allowDiskUse=True)).next()
+        page = page_from_facets(facets, limit, count_mode)
+        if snippets:
+            add_match_offsets(page["results"], keywords)
+        return page
+
+    try:
+        params = search_cache_params(
+            volume, page_numbers, dates, topics, keywords, year, volume_set, limit, cursor, snippets, count_mode
+        )
+        # Reading the cache generation may poll the meta collection
+        key = await asyncio.to_thread(cache_key, "search", params)
+        result, _ = await search_cache.get_or_compute_async(key, run)
+        return result
+    except Exception as e:
+        print(f"Database error: {e}")
+        return dict(EMPTY_SEARCH)
+
+
+async def get_page_window_async(page_id: str, before: int = 2, after: int = 2):
+    """get_page_window on the async client."""
+    before = max(0, min(int(before), MAX_WINDOW_PAGES))
+    after = max(0, min(int(after), MAX_WINDOW_PAGES))
+
+    window_ids, current_index = await asyncio.to_thread(window_page_ids, ObjectId(page_id), before, after)
+    if not window_ids:
+        return None
+
+    docs = await get_async_db()["pages"].find({"_id": {"$in": window_ids}}, PAGE_PROJECTION).to_list()
+    by_id = {doc["_id"]: doc for doc in docs}
+
+    return {
+        "pages": [by_id[window_id] for window_id in window_ids if window_id in by_id],
+        "current_index": current_index,
+    }
+
+
+async def get_project_async(data):
+    """get_project on the async client."""
+    offset, limit, sort = project_window(data)
+
+    db = get_async_db()
+    p = await db["projects"].find_one({"_id": ObjectId(data["_id"])}, PROJECT_WINDOW_PROJECTION)
+    if not p:
+        return None
+
+    # The "volume" order may have to be sorted and cached first
+    window_ids = await asyncio.to_thread(project_window_ids, p, offset, limit, sort)
+    if not window_ids:
+        return add_page_docs(p, [], window_ids, offset, limit, None)
+
+    async def summaries():
+        return await (await db["pages"].aggregate(project_pages_pipeline(window_ids))).to_list()
+
+    # The summaries and the window's keywords and metadata are independent reads
+    docs, annotations = await asyncio.gather(
+        summaries(),
+        db["projects"].find_one({"_id": p["_id"]}, page_annotations_projection(window_ids)),
+    )
+
+    return add_page_docs(p, docs, window_ids, offset, limit, annotations)
+
+
+@quart_app.route("/api/search", methods=["POST"])
+async def search():
+    try:
+        data = await request.get_json()
+
+        results = await search_journals_async(**search_arguments(data))
+        return jsonify({"results": results})
+    except ValueError as e:
+        # Bad limit, cursor or count_mode supplied by the client
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error occurred:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@quart_app.route("/api/results", methods=["POST"])
+async def get_results():
+    try:
+        data = await request.get_json()
+        page_ids = data.get("page_ids", [])
+
+        if not page_ids:
+            return jsonify({"error": "No page IDs provided"}), 400
+
+        object_ids = [ObjectId(page_id) for page_id in page_ids]
+        results = await get_async_db()["pages"].find({"_id": {"$in": object_ids}}, PAGE_PROJECTION).to_list()
+        return jsonify({"results": results})
+    except Exception as e:
+        print("Error occurred:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@quart_app.route("/api/page/get", methods=["POST"])
+async def api_get_page():
+    try:
+        data = await request.get_json()
+        if not data:
+            return {"error": "No JSON data found"}, 400
+
+        page = await get_async_db()["pages"].find_one({"_id": ObjectId(data["_id"])}, PAGE_PROJECTION)
+        if page is None:
+            return {"error": "Page not found"}, 404
+
+        return jsonify({"page": page})
+
+    except Exception as e:
+        return {"error": str(e)}, 400
+
+
+@quart_app.route("/api/page/adjacent", methods=["POST"])
+async def get_adjacent_page_endpoint():
+    try:
+        data = await request.get_json()
+        page_id = data.get("page_id")
+        direction = data.get("direction", "next")  # "next" or "previous"
+
+        if not page_id:
+            return jsonify({"error": "No page ID provided"}), 400
+
+        adjacent_id = await asyncio.to_thread(adjacent_page_id, ObjectId(page_id), direction)
+        adjacent_page = None
+        if adjacent_id is not None:
+            adjacent_page = await get_async_db()["pages"].find_one({"_id": adjacent_id}, PAGE_PROJECTION)
+
+        if not adjacent_page:
+            return jsonify({"error": f"No {direction} page found"}), 404
+
+        return jsonify({"page": adjacent_page})
+
+    except Exception as e:
+        print(f"Error getting adjacent page: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@quart_app.route("/api/page/window", methods=["POST"])
+async def get_page_window_endpoint():
+    try:
+        data = await request.get_json()
+        page_id = data.get("page_id") if data else None
+
+        if not page_id:
+            return jsonify({"error": "No page ID provided"}), 400
+
+        window = await get_page_window_async(page_id, data.get("before", 2), data.get("after", 2))
+
+        if not window:
+            return jsonify({"error": "Page not found"}), 404
+
+        return jsonify(window)
+
+    except Exception as e:
+        print(f"Error getting page window: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@quart_app.route("/api/project", methods=["POST"])
+async def api_get_project():
+    try:
+        data = await request.get_json()
+        if not data:
+            return {"error": "No JSON data found"}, 400
+        project = await get_project_async(data)
+        if not project:
+            return {"error": "No project found"}, 400
+        return jsonify({"project": project})
+
+    except Exception as e:
+        return {"error": str(e)}, 400
+
+
+# Requests answered by the async handlers above; everything else goes to Flask
+ASYNC_ROUTES = {
+    (rule.rule, method)
+    for rule in quart_app.url_map.iter_rules()
+    if rule.endpoint != "static"
+    for method in rule.methods
+}
+
+flask_fallback = WsgiToAsgi(flask_app)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and (scope["path"], scope["method"]) not in ASYNC_ROUTES:
+        await flask_fallback(scope, receive, send)
+    else:
+        await quart_app(scope, receive, send)
@@ -0,0 +1,384 @@
+"""
+Microbenchmarks for the search, navigation and export hot paths.
+
+Seeds a synthetic pages/projects corpus of each requested size into a
+local mongod, times the hot paths against it and writes the results as
+JSON so runs from different commits can be compared. The database named
+by --db is dropped and reseeded.
+
+Usage:
+    python benchmarks/bench_hot_paths.py --sizes 10000 100000 --output bench.json
+    python benchmarks/bench_hot_paths.py --uri mongodb://localhost:27017 --sizes 1000000
+
+The first result of every benchmark is checked against the seeded data.
+Some read paths answer database errors with empty results, so a benchmark
+whose result is wrong is reported as an error rather than timed.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The benchmark never talks to the configured database
+os.environ.setdefault("MONGO", "mongodb://localhost:27017")
+
+WORDS = (
+    "the of and to a in that is was he for it with as his on be at by this had not are but from or have "
+    "an they which one you were her all she there would their we him been has when who will more no if out "
+    "so said what up its about into than them can only other new some could time these two may then do "
+    "first any my now such like our over man me even most made after also did many before must through "
+    "parliament lords commons king majesty bill act petition committee speaker resolved ordered read second "
+    "third time house message conference subsidy taxation treasury ordinance militia navy excise tonnage "
+    "poundage recusants petition grievance privilege impeachment attainder statute realm crown council"
+).split()
+
+TOPICS = ["taxation", "religion", "military", "trade", "petitions", "privilege", "finance", "ireland", "scotland"]
+
+VOLUME_SETS = ["parliamentary proceedings", "statutes of the realm"]
+
+PAGES_PER_VOLUME = 500
+
+
+def make_pages(size, rng):
+    """Yield synthetic page documents in the shape the OCR pipeline produces."""
+    volumes = max(1, -(-size // PAGES_PER_VOLUME))
+    for volume in range(volumes):
+        volume_set = VOLUME_SETS[volume % len(VOLUME_SETS)]
+        start_year = 1600 + (volume * 3) % 120
+        volume_title = f"Journal of the House, Volume {volume + 1} ({start_year}-{(start_year + 2) % 100:02d})"
+        for page_number in range(1, PAGES_PER_VOLUME + 1):
+            if volume * PAGES_PER_VOLUME + page_number > size:
+                return
+            year = start_year + rng.randint(0, 2)
+            date = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            yield {
+                "volume_set": volume_set,
+                "volume_id": volume + 1,
+                "volume_title": volume_title,
+                "page_number": page_number,
+                "dates": date,
+                "date": date,
+                "topics": rng.sample(TOPICS, rng.randint(0, 3)),
+                "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(250, 450))),
+            }
+
+
+def seed(db, size, projects, project_pages, rng):
+    """Drop and refill the pages and projects collections."""
+    from ingest import prepare_page
+
+    for name in ("pages", "projects", "volumes", "meta"):
+        db[name].drop()
+
+    batch = []
+    for page in make_pages(size, rng):
+        batch.append(prepare_page(page))
+        if len(batch) >= 5000:
+            db["pages"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        db["pages"].insert_many(batch, ordered=False)
+
+    page_ids = [str(doc["_id"]) for doc in db["pages"].find({}, {"_id": 1})]
+    for p in range(projects):
+        members = rng.sample(page_ids, min(project_pages, len(page_ids)))
+        db["projects"].insert_one({
+            "title": f"Benchmark project {p}",
+            "description": "",
+            "pages": members,
+            "page_keywords": {page_id: "parliament" for page_id in members[::10]},
+            "page_metadata": {
+                page_id: {
+                    "passages": [{"id": f"{page_id}-{i}", "text": "passage text", "start": 0, "end": 12} for i in range(rng.randint(1, 4))],
+                    "passage_notes": {f"{page_id}-0": "note"},
+                    "page_notes": "page note",
+                }
+                for page_id in members[::5]
+            },
+        })
+
+    return page_ids
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def time_call(fn, repeat, check=None):
+    """Run fn repeat times and summarise the wall-clock durations in milliseconds.
+
+    check, if given, is called with the result of the first run and raises
+    AssertionError if the result is wrong.
+    """
+    durations = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+        if run == 0 and check is not None:
+            check(result)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.mean(durations), 3),
+    }
+
+
+def search_filter_sets(sample_page):
+    """Every combination of search_journals filters, built around a real page."""
+    filters = {
+        "volume": [sample_page["volume_id"]],
+        "page_numbers": ["1", "50"],
+        "dates": ["1640-01-01", "1650-12-31"],
+        "topics": ["taxation"],
+        "keywords": ["parliament", "subsidy"],
+        "year": "1640-42",
+    }
+    names = sorted(filters)
+    for count in range(len(names) + 1):
+        for combo in itertools.combinations(names, count):
+            yield "+".join(combo) or "none", {name: filters[name] for name in combo}
+
+
+def run_size(db, size, args, rng):
+    import catalog
+    import manifest
+    import versions
+    from app import app
+    from indexes import ensure_indexes
+    from projects import get_project
+    from results import get_adjacent_page, get_pages_by_ids
+    from search import (
+        COUNT_CAP,
+        MAX_MULTI_SEARCH,
+        build_search_query,
+        date_histogram,
+        extract_years,
+        multi_search,
+        search_facets,
+        search_journals,
+    )
+
+    print(f"Seeding {size} pages...", file=sys.stderr)
+    seed_start = time.perf_counter()
+    page_ids = seed(db, size, args.projects, args.project_pages, rng)
+    ensure_indexes()
+    print(f"Seeded in {time.perf_counter() - seed_start:.1f}s", file=sys.stderr)
+
+    # Forget anything cached about the previous corpus
+    versions._versions.clear()
+    catalog._view = None
+
+    sample_page = db["pages"].find_one({"page_number": 2})
+    project_id = str(db["projects"].find_one({}, {"_id": 1})["_id"])
+    titles = db["pages"].distinct("volume_title")
+    client = app.test_client()
+
+    def reset_catalog():
+        catalog._view = None
+        catalog.rebuild_catalog()
+
+    def reset_manifests():
+        manifest._manifests.clear()
+        manifest._page_index.clear()
+        manifest._volume_order = None
+
+    reset_manifests()
+
+    # Large responses for comparing the JSON providers. The stdlib variant
+    # repeats what the handlers and Flask's default provider used to do:
+    # str() every _id in place, then json.dumps with sorted keys. It runs
+    # after the orjson variant, which therefore still sees ObjectIds.
+    big_search = search_journals(limit=500)
+    big_pages = get_pages_by_ids([str(page["_id"]) for page in db["pages"].find({}, {"_id": 1}).limit(200)])
+
+    def stdlib_dumps(payload, docs):
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+        return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+    def matching(filters):
+        """Pages matching a filter set, counted directly rather than through search_journals."""
+        query = build_search_query(
+            *(filters.get(name) for name in ("volume", "page_numbers", "dates", "topics", "keywords", "year")),
+            "parliamentary proceedings",
+        )
+        return db["pages"].count_documents(query) if query is not None else 0
+
+    expect(len(big_search["results"]) == min(matching({}), 500), "search for the serialization payload failed")
+
+    def search_check(filters, limit=50):
+        expected = matching(filters)
+
+        def check(page):
+            expect(page["count"] == expected, f"count {page['count']}, expected {expected}")
+            expect(len(page["results"]) == min(expected, limit), f"{len(page['results'])} results")
+
+        return check
+
+    def pages_check(checks):
+        def check(pages):
+            for check_page, page in zip(checks, pages):
+                check_page(page)
+
+        return check
+
+    def fetch(response):
+        expect(response.status_code == 200, f"HTTP {response.status_code}")
+        expect(response.get_data(), "empty response")
+
+    benchmarks = []
+    for label, filters in search_filter_sets(sample_page):
+        benchmarks.append((
+            f"search_journals[{label}]",
+            lambda f=filters: search_journals(**f, limit=50),
+            search_check(filters),
+        ))
+    multi = [dict(filters, limit=50) for _, filters in search_filter_sets(sample_page)][:MAX_MULTI_SEARCH]
+    multi_checks = [search_check(filters) for filters in multi]
+    benchmarks.append((f"multi_search[{len(multi)} filter sets]", lambda: multi_search(multi), pages_check(multi_checks)))
+    benchmarks.append((
+        f"search_journals[same {len(multi)}, one by one]",
+        lambda: [search_journals(**f) for f in multi],
+        pages_check(multi_checks),
+    ))
+    benchmarks.append((
+        "search_facets[keywords]",
+        lambda: search_facets(keywords=["parliament"]),
+        lambda facets: expect(facets["count"] == matching({"keywords": ["parliament"]}), "facet count"),
+    ))
+    benchmarks.append((
+        "date_histogram[month]",
+        lambda: date_histogram(interval="month"),
+        lambda histogram: expect(histogram["buckets"], "no buckets"),
+    ))
+    capped = min(matching({}), COUNT_CAP)
+    benchmarks.append((
+        "search_journals[none,capped count]",
+        lambda: search_journals(limit=50, count_mode="capped"),
+        lambda page: expect(page["count"] == capped and len(page["results"]) == min(capped, 50), "capped count"),
+    ))
+    benchmarks.append((
+        "search_journals[keywords,snippets]",
+        lambda: search_journals(keywords=["parliament"], limit=50, snippets=True),
+        lambda page: expect(page["results"] and all("snippet" in doc for doc in page["results"]), "no snippets"),
+    ))
+
+    def export_json():
+        fetch(client.post("/api/project/export/csv", json={"project_id": project_id}))
+
+    def export_stream():
+        fetch(client.get(f"/api/project/export/csv/stream?project_id={project_id}"))
+
+    def has_years(years):
+        expect(years["years"], "no years")
+
+    def has_page_docs(project):
+        expect(project and project["page_docs"], "no page_docs")
+
+    def has_page(page):
+        expect(page, "no adjacent page")
+
+    benchmarks += [
+        ("extract_years[all titles]", lambda: [extract_years(title) for title in titles], None),
+        ("get_all_years[cold]", lambda: (reset_catalog(), catalog.get_all_years())[1], has_years),
+        ("get_all_years[warm]", catalog.get_all_years, has_years),
+        ("get_project[first window]", lambda: get_project({"_id": project_id}), has_page_docs),
+        (
+            "get_project[volume sort]",
+            lambda: get_project({"_id": project_id, "page_sort": "volume", "page_offset": 200}),
+            has_page_docs,
+        ),
+        (
+            "get_adjacent_page[cold]",
+            lambda: (reset_manifests(), get_adjacent_page(str(sample_page["_id"]), "next"))[1],
+            has_page,
+        ),
+        ("get_adjacent_page[warm]", lambda: get_adjacent_page(str(sample_page["_id"]), "next"), has_page),
+        ("serialize[search 500,orjson]", lambda: app.json.dumps({"results": big_search}), None),
+        ("serialize[search 500,stdlib]", lambda: stdlib_dumps({"results": big_search}, big_search["results"]), None),
+        ("serialize[results 200,orjson]", lambda: app.json.dumps({"results": big_pages}), None),
+        ("serialize[results 200,stdlib]", lambda: stdlib_dumps({"results": big_pages}, big_pages), None),
+        ("export_csv[json]", export_json, None),
+        ("export_csv[stream]", export_stream, None),
+    ]
+
+    results = []
+    for name, fn, check in benchmarks:
+        result = {"size": size, "name": name}
+        try:
+            result.update(time_call(fn, args.repeat, check))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        print(f"{size:>8} {name:<55} {result.get('median_ms', result.get('error'))}", file=sys.stderr)
+        results.append(result)
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000], help="Corpus sizes in pages")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="mongod to seed and query")
+    parser.add_argument("--db", default="hppap_bench", help="Database to (re)seed")
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--project-pages", type=int, default=2000, help="Pages per synthetic project")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1640)
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    os.environ["MONGO_DB"] = args.db
+    # Time the queries themselves, not the search cache in front of them
+    os.environ["SEARCH_CACHE"] = "off"
+
+    import db as db_module
+    from pymongo import MongoClient
+
+    client = MongoClient(args.uri)
+    db_module.DB_NAME = args.db
+    db_module.set_client(client)
+    db = db_module.get_db()
+
+    rng = random.Random(args.seed)
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(db, size, args, rng))
+
+    report = {
+        "commit": git_commit(),
+        "mongod": client.server_info()["version"],
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Result caches shared by the read paths.
+
+A ResultCache keeps computed results for a fixed time (ttl) and then for a
+further grace period (stale) in which they are still served while a single
+background refresh recomputes them. If the recompute fails, for example
+because Mongo is slow or unreachable, the stale value keeps being served
+until the grace period runs out.
+
+Backends are chosen with SEARCH_CACHE:
+    memory  in-process LRU, capped at SEARCH_CACHE_SIZE entries (default)
+    redis   shared store at SEARCH_CACHE_URL, so gunicorn workers share hits
+            (pip install redis; size is bounded by the server's maxmemory policy)
+    off     no caching
+
+Keys carry the "pages" version counter, so bumping it (invalidate_pages)
+retires every cached search. The worker that made the edit sees the new
+version at once; other workers poll the counter every
+SEARCH_CACHE_VERSION_SECONDS, so they may serve pre-edit results for up to
+that long. If the counter cannot be read, the last version seen is used,
+so a slow or unreachable Mongo still gets cached and stale results.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from versions import bump_version, get_version, last_version
+
+PAGES_VERSION = "pages"
+
+SEARCH_CACHE = os.environ.get("SEARCH_CACHE", "memory").lower()
+SEARCH_CACHE_URL = os.environ.get("SEARCH_CACHE_URL", "redis://localhost:6379/0")
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_STALE_SECONDS = float(os.environ.get("SEARCH_CACHE_STALE_SECONDS", "3600"))
+# How often each worker re-reads the pages version, i.e. how long an edit made
+# in another worker can take to retire this worker's cached searches
+SEARCH_CACHE_VERSION_SECONDS = float(os.environ.get("SEARCH_CACHE_VERSION_SECONDS", "1"))
+
+
+class MemoryBackend:
+    """In-process LRU of (value, stored_at, expires_at) entries."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key: str, value: Any, expires_in: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (value, now, now + expires_in)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Entries stored as JSON in a Redis-compatible server, expired by the server."""
+
+    def __init__(self, url: str, prefix: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["value"], entry["stored_at"]
+
+    def set(self, key: str, value: Any, expires_in: float) -> None:
+        raw = json.dumps({"value": value, "stored_at": time.time()}, default=str)
+        self.client.set(self.prefix + key, raw, ex=max(1, int(expires_in)))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+class ResultCache:
+    """Cache in front of an expensive function, with stale-while-revalidate."""
+
+    def __init__(self, backend, ttl: float, stale: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale = stale
+        self._refreshing = set()
+        self._tasks = set()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """
+        Return the cached value for key, computing it on a miss
+
+        Args:
+            key: Cache key, already normalized by the caller
+            compute: Function producing the value; exceptions propagate on a miss
+
+        Returns:
+            (value, outcome) where outcome is "hit", "stale" or "miss"
+        """
+        if self.backend is None:
+            return compute(), "miss"
+
+        entry = self._read(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                return value, "hit"
+            self._refresh_in_background(key, compute)
+            return value, "stale"
+
+        value = compute()
+        self._write(key, value)
+        return value, "miss"
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """get_or_compute for a coroutine function; stale entries are refreshed in a task."""
+        if self.backend is None:
+            return await compute(), "miss"
+
+        entry = self._read(key)
+        if entry is not None:
+            value, stored_at = entry
+            if time.time() - stored_at < self.ttl:
+                return value, "hit"
+            self._refresh_in_task(key, compute)
+            return value, "stale"
+
+        value = await compute()
+        self._write(key, value)
+        return value, "miss"
+
+    def get(self, key: str) -> Any:
+        """Return the value cached for key if it is still fresh, else None."""
+        if self.backend is None:
+            return None
+        entry = self._read(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        if self.backend is not None:
+            self._write(key, value)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _read(self, key: str) -> Optional[Tuple[Any, float]]:
+        # A broken cache must never take searches down with it
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"Cache read failed: {e}")
+            return None
+
+    def _write(self, key: str, value: Any) -> None:
+        try:
+            self.backend.set(key, value, self.ttl + self.stale)
+        except Exception as e:
+            print(f"Cache write failed: {e}")
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._write(key, compute())
+            except Exception as e:
+                # Keep serving the stale value; the next request tries again
+                print(f"Cache refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _refresh_in_task(self, key: str, compute: Callable[[], Awaitable[Any]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                self._write(key, await compute())
+            except Exception as e:
+                print(f"Cache refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def make_backend(kind: str, prefix: str):
+    """Build the backend named by kind, falling back to memory if Redis is unavailable."""
+    if kind == "off":
+        return None
+    if kind == "redis":
+        try:
+            return RedisBackend(SEARCH_CACHE_URL, prefix)
+        except ImportError:
+            print("SEARCH_CACHE=redis needs the redis package; using the in-process cache")
+    return MemoryBackend(SEARCH_CACHE_SIZE)
+
+
+search_cache = ResultCache(
+    make_backend(SEARCH_CACHE, "search:"),
+    ttl=SEARCH_CACHE_TTL,
+    stale=SEARCH_CACHE_STALE_SECONDS,
+)
+
+
+def pages_version() -> int:
+    """The pages version, polled every SEARCH_CACHE_VERSION_SECONDS, or the last one seen if Mongo fails."""
+    try:
+        return get_version(PAGES_VERSION, max_age=SEARCH_CACHE_VERSION_SECONDS)
+    except Exception as e:
+        version = last_version(PAGES_VERSION)
+        if version is None:
+            raise
+        print(f"Pages version read failed, using {version}: {e}")
+        return version
+
+
+def cache_key(namespace: str, params: dict) -> str:
+    """Key for a normalized parameter dict under the current pages version."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+    # With caching off the key is never looked up, so skip the version read
+    version = pages_version() if search_cache.backend is not None else 0
+    return f"{namespace}:{version}:{digest}"
+
+
+def invalidate_pages() -> int:
+    """Retire every cached result derived from the pages collection."""
+    return bump_version(PAGES_VERSION)
@@ -0,0 +1,190 @@
+"""
+Materialized catalog of volumes backing /api/years and /api/volume-sets.
+
+The "volumes" collection holds one document per (volume_set, volume_title)
+with its volume_id, extracted years, year ranges and page count. Each
+worker keeps an in-memory view of it that is rebuilt when the "volumes"
+version counter changes, so the read endpoints never touch MongoDB on
+the hot path.
+"""
+
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from pymongo import ReplaceOne
+
+from db import get_collection, get_pages_collection
+from search import extract_years
+from versions import bump_version, get_version
+
+CATALOG_VERSION = "volumes"
+
+# Regular expressions to find year ranges
+RANGE_PATTERNS = [
+    r"(\d{4})[-/](\d{2})",  # Like 1640-42
+    r"(\d{4})[-/](\d{4})",  # Like 1640-1642
+]
+
+_lock = threading.Lock()
+_view = None
+
+
+def title_ranges(title: str) -> List[str]:
+    """Returns the original year ranges in a title plus any standalone years outside them."""
+    ranges = set()
+
+    # Extract original range formats
+    for pattern in RANGE_PATTERNS:
+        for match in re.finditer(pattern, title):
+            ranges.add(match.group(0))  # Get the original range text
+
+    # Also add standalone years as ranges, unless part of a range we already captured
+    for match in re.finditer(r"\b(\d{4})\b", title):
+        year = match.group(0)
+        if not any(year in range_text for range_text in ranges):
+            ranges.add(year)
+
+    return sorted(ranges)
+
+
+def volume_entry(volume_set: str, volume_title: str, volume_id: Any, page_count: int) -> Dict[str, Any]:
+    """Build the catalog document for one volume."""
+    title = volume_title or ""
+    return {
+        "_id": {"volume_set": volume_set, "volume_title": volume_title},
+        "volume_set": volume_set,
+        "volume_title": volume_title,
+        "volume_id": volume_id,
+        "years": extract_years(title),
+        "ranges": title_ranges(title),
+        "page_count": page_count,
+    }
+
+
+def rebuild_catalog() -> int:
+    """
+    Recompute the whole catalog from the pages collection
+
+    Returns:
+        Number of volumes in the catalog
+    """
+    pipeline = [
+        {
+            "$group": {
+                "_id": {"volume_set": "$volume_set", "volume_title": "$volume_title"},
+                "volume_id": {"$min": "$volume_id"},
+                "page_count": {"$sum": 1},
+            }
+        }
+    ]
+
+    volumes = get_collection("volumes")
+    entries = [
+        volume_entry(row["_id"].get("volume_set"), row["_id"].get("volume_title"), row.get("volume_id"), row["page_count"])
+        for row in get_pages_collection().aggregate(pipeline)
+    ]
+
+    if entries:
+        volumes.bulk_write(
+            [ReplaceOne({"_id": entry["_id"]}, entry, upsert=True) for entry in entries],
+            ordered=False,
+        )
+    volumes.delete_many({"_id": {"$nin": [entry["_id"] for entry in entries]}})
+
+    bump_version(CATALOG_VERSION)
+    print(f"Rebuilt volume catalog with {len(entries)} volumes")
+    return len(entries)
+
+
+def refresh_volumes(keys: Iterable[Tuple[str, str]]) -> None:
+    """
+    Recompute the catalog entries for the given volumes after their pages changed
+
+    Args:
+        keys: (volume_set, volume_title) pairs that were ingested or edited
+    """
+    pages = get_pages_collection()
+    volumes = get_collection("volumes")
+
+    operations = []
+    for volume_set, volume_title in set(keys):
+        query = {"volume_set": volume_set, "volume_title": volume_title}
+        page_count = pages.count_documents(query)
+        key = {"volume_set": volume_set, "volume_title": volume_title}
+
+        if page_count:
+            first_page = pages.find_one(query, {"volume_id": 1}, sort=[("volume_id", 1)])
+            entry = volume_entry(volume_set, volume_title, first_page.get("volume_id"), page_count)
+            operations.append(ReplaceOne({"_id": key}, entry, upsert=True))
+        else:
+            volumes.delete_one({"_id": key})
+
+    if operations:
+        volumes.bulk_write(operations, ordered=False)
+    bump_version(CATALOG_VERSION)
+
+
+def build_view(volumes: List[Dict[str, Any]], version: int) -> Dict[str, Any]:
+    """Precompute the payloads of the catalog endpoints from the catalog documents."""
+    years = set()
+    ranges = set()
+    for volume in volumes:
+        years.update(volume.get("years", []))
+        ranges.update(volume.get("ranges", []))
+
+    # A standalone year is dropped when another title lists it as part of a range
+    range_texts = [r for r in ranges if not re.fullmatch(r"\d{4}", r)]
+    years_in_ranges = {text[i : i + 4] for text in range_texts for i in range(len(text) - 3)}
+    ranges = {r for r in ranges if r in range_texts or r not in years_in_ranges}
+
+    return {
+        "version": version,
+        "volumes": volumes,
+        "years": sorted(years),
+        "ranges": sorted(ranges),
+        "volume_sets": sorted({v["volume_set"] for v in volumes if v.get("volume_set")}),
+    }
+
+
+def get_catalog() -> Dict[str, Any]:
+    """Return this worker's view of the catalog, reloading it if another worker changed it."""
+    global _view
+
+    version = get_version(CATALOG_VERSION)
+    if _view is not None and _view["version"] == version:
+        return _view
+
+    with _lock:
+        if _view is not None and _view["version"] == version:
+            return _view
+
+        volumes = list(get_collection("volumes").find())
+        if not volumes and version == 0:
+            # First run against this database: materialize the catalog
+            rebuild_catalog()
+            version = get_version(CATALOG_VERSION, max_age=0)
+            volumes = list(get_collection("volumes").find())
+
+        _view = build_view(volumes, version)
+        return _view
+
+
+def get_all_years():
+    """
+    Returns information about years available in the database
+    including both individual years and the original ranges.
+
+    Database errors propagate: an empty list served in their place would
+    be cached by browsers under the catalog's ETag.
+    """
+    catalog = get_catalog()
+    return {"years": catalog["years"], "ranges": catalog["ranges"]}
+
+
+def get_volume_sets():
+    """
+    Returns all available document collections (volume_set values) in the database.
+    Database errors propagate, as in get_all_years.
+    """
+    return get_catalog()["volume_sets"]
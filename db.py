@@ -0,0 +1,147 @@
+"""
+Shared MongoDB client for the whole application.
+
+The client is created lazily on first use in each process, so gunicorn
+workers never inherit a client (and its sockets) from the master across
+fork. Pool size, timeouts and wire compression come from the environment:
+
+    MONGO                               connection string (required)
+    MONGO_DB                            database name (default "test")
+    MONGO_MAX_POOL_SIZE                 connections per worker (default 20)
+    MONGO_MIN_POOL_SIZE                 connections kept open (default 0)
+    MONGO_MAX_IDLE_TIME_MS              close idle connections after this long
+    MONGO_CONNECT_TIMEOUT_MS            default 10000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS   default 10000
+    MONGO_SOCKET_TIMEOUT_MS             per-operation socket timeout (default none)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS         wait for a free pooled connection (default none)
+    MONGO_COMPRESSORS                   e.g. "zstd,snappy,zlib" (default none)
+
+The ASGI server (asgi.py) uses pymongo's AsyncMongoClient through
+get_async_db(), built from the same options.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import os
+import threading
+from typing import Any, Dict
+
+import certifi
+from pymongo import MongoClient
+
+DB_NAME = os.environ.get("MONGO_DB", "test")
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+_async_client = None
+_async_client_pid = None
+
+# pymongo monitoring listeners attached to every client this module creates
+_event_listeners = []
+
+
+def _int_env(name: str, default=None):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def client_options() -> Dict[str, Any]:
+    """Build the MongoClient keyword arguments from the environment."""
+    options = {
+        "tlsCAFile": certifi.where(),
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 20),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 10000),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000),
+    }
+
+    optional = {
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS"),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS"),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+    }
+    options.update({key: value for key, value in optional.items() if value is not None})
+
+    compressors = os.environ.get("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+
+    if _event_listeners:
+        options["event_listeners"] = list(_event_listeners)
+
+    return options
+
+
+def add_event_listener(listener) -> None:
+    """Attach a pymongo monitoring listener to clients created from now on.
+
+    Listeners must be registered before the first database call in the
+    process, since the client is built once and keeps its listeners.
+    """
+    _event_listeners.append(listener)
+
+
+def get_client() -> MongoClient:
+    """Return this process's MongoClient, creating it on first use."""
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != pid:
+            # A client inherited from the parent across fork must not be
+            # used in the child, so each process builds its own
+            _client = MongoClient(os.environ["MONGO"], **client_options())
+            _client_pid = pid
+        return _client
+
+
+def set_client(client) -> None:
+    """Use an existing client instead of connecting to MONGO (e.g. mongomock or a local mongod)."""
+    global _client, _client_pid
+
+    with _lock:
+        _client = client
+        _client_pid = os.getpid()
+
+
+def get_async_client():
+    """Return this process's AsyncMongoClient, creating it on first use.
+
+    Needs pymongo 4.13 or later; only the ASGI server calls it.
+    """
+    global _async_client, _async_client_pid
+
+    from pymongo import AsyncMongoClient
+
+    pid = os.getpid()
+    with _lock:
+        if _async_client is None or _async_client_pid != pid:
+            _async_client = AsyncMongoClient(os.environ["MONGO"], **client_options())
+            _async_client_pid = pid
+        return _async_client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def get_async_db():
+    return get_async_client()[DB_NAME]
+
+
+def get_collection(name: str):
+    return get_db()[name]
+
+
+def get_pages_collection():
+    return get_db()["pages"]
+
+
+def get_projects_collection():
+    return get_db()["projects"]
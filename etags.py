@@ -0,0 +1,82 @@
+"""
+Strong ETags for the read endpoints, built from cheap version markers.
+
+    catalog   the "volumes" version counter (polled, no query most of the time)
+    page      the page's _id and its "rev" counter, bumped by every page write
+    project   the project's "revision" counter plus the "pages" version
+              counter, since project windows show page dates and topics
+
+Checking a tag costs at most a lookup of one small field by _id, so a
+client that already has the payload gets a 304 without the document text
+being read or serialized.
+"""
+
+import hashlib
+from typing import Callable, List, Optional
+
+from bson.objectid import ObjectId
+from flask import jsonify, make_response, request
+
+from cache import PAGES_VERSION
+from catalog import CATALOG_VERSION
+from db import get_pages_collection, get_projects_collection
+from versions import get_version
+
+# The catalog only changes on ingestion, so browsers may reuse it briefly
+CATALOG_CACHE_CONTROL = "public, max-age=60"
+# Pages and projects are edited by curators and must always be revalidated
+PAGE_CACHE_CONTROL = "no-cache"
+PROJECT_CACHE_CONTROL = "private, no-cache"
+
+
+def catalog_etag(name: str) -> str:
+    return f"{name}-{get_version(CATALOG_VERSION)}"
+
+
+def page_etag(page_id: str) -> Optional[str]:
+    """ETag for one page, or None if it does not exist."""
+    doc = get_pages_collection().find_one({"_id": ObjectId(page_id)}, {"rev": 1})
+    if not doc:
+        return None
+    return f"page-{page_id}-{doc.get('rev', 0)}"
+
+
+def pages_etag(page_ids: List[str]) -> str:
+    """ETag for a set of pages, in the order requested."""
+    object_ids = [ObjectId(page_id) for page_id in page_ids]
+    revs = {
+        doc["_id"]: doc.get("rev", 0)
+        for doc in get_pages_collection().find({"_id": {"$in": object_ids}}, {"rev": 1})
+    }
+    key = ",".join(f"{object_id}:{revs.get(object_id, '-')}" for object_id in object_ids)
+    return "pages-" + hashlib.sha1(key.encode("ascii")).hexdigest()
+
+
+def project_etag(project_id: str) -> Optional[str]:
+    """ETag for a project and the page summaries in it, or None if it does not exist."""
+    doc = get_projects_collection().find_one({"_id": ObjectId(project_id)}, {"revision": 1})
+    if not doc:
+        return None
+    # Read the pages counter fresh: a page edit in another worker must show up at once
+    return f"project-{project_id}-{doc.get('revision', 0)}-{get_version(PAGES_VERSION, max_age=0)}"
+
+
+def conditional_json(etag: str, build: Callable[[], object], cache_control: str):
+    """
+    Answer a GET with 304 if the client already holds etag, else with JSON
+
+    Args:
+        etag: Strong ETag of the current representation (unquoted)
+        build: Produces the JSON body; only called when it has to be sent
+        cache_control: Cache-Control header for either response
+    """
+    # If-None-Match uses the weak comparison (RFC 7232), so the 304 still
+    # fires when a compressing proxy has turned the tag into W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(build())
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,10 @@
+# gunicorn loads this file automatically from the working directory.
+import os
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the live gauge samples of workers that have exited (see metrics.py)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,176 @@
+"""
+Declarative index spec plus a bootstrap/verification command.
+
+Usage:
+    python indexes.py            # create missing indexes, then check query plans
+    python indexes.py --check    # only check query plans
+
+The check runs explain() on a canonical query for each endpoint and
+reports any whose winning plan falls back to a collection scan. Set
+ENSURE_INDEXES_ON_STARTUP=1 to have app.py create missing indexes when
+it starts.
+"""
+
+import argparse
+import sys
+from typing import Any, Dict, List
+
+from db import get_db
+from search import SEARCH_SORT, trigram_clause
+
+# Indexes the application relies on, by collection. Each entry is passed
+# straight to create_index, which is a no-op when the index already exists.
+INDEXES = {
+    "pages": [
+        # Search filtered by collection, in keyset (volume_id, page_number, _id) order
+        {
+            "keys": [("volume_set", 1), ("volume_id", 1), ("page_number", 1), ("_id", 1)],
+            "name": "volume_set_volume_id_page_number",
+        },
+        # Volume manifests, adjacent-page navigation and the volume ordering
+        {"keys": [("volume_id", 1), ("page_number", 1)], "name": "volume_id_page_number"},
+        # Multikey index over each page's text trigrams (keyword search)
+        {"keys": [("text_trigrams", 1)], "name": "text_trigrams"},
+        # Multikey index over the years in each page's volume title (year search)
+        {"keys": [("years", 1)], "name": "years"},
+        # Page counts when refreshing a volume's catalog entry
+        {"keys": [("volume_set", 1), ("volume_title", 1)], "name": "volume_set_volume_title"},
+        # Date range search and histograms over the parsed dates (YYYYMMDD keys)
+        {"keys": [("date_keys", 1)], "name": "date_keys"},
+        # Raw date strings, for date filters that do not parse
+        {"keys": [("dates", 1)], "name": "dates"},
+        # Topic filter
+        {"keys": [("topics", 1)], "name": "topics"},
+    ],
+    "projects": [
+        # Multikey index over each project's page IDs (page -> projects lookup)
+        {"keys": [("pages", 1)], "name": "pages"},
+    ],
+}
+
+
+def ensure_indexes():
+    """Create any missing indexes from INDEXES and return their names."""
+    created = []
+    for collection_name, specs in INDEXES.items():
+        for spec in specs:
+            options = {key: value for key, value in spec.items() if key != "keys"}
+            name = get_db()[collection_name].create_index(spec["keys"], **options)
+            created.append(f"{collection_name}.{name}")
+    return created
+
+
+def canonical_queries() -> List[Dict[str, Any]]:
+    """One representative query per endpoint, filled in with values from a real page."""
+    sample = get_db()["pages"].find_one({}, {"volume_set": 1, "volume_id": 1, "volume_title": 1, "page_number": 1}) or {}
+    volume_set = sample.get("volume_set", "parliamentary proceedings")
+    volume_id = sample.get("volume_id", 1)
+    page_id = str(sample.get("_id", "000000000000000000000000"))
+
+    return [
+        {
+            "endpoint": "/api/search (volume_set)",
+            "collection": "pages",
+            "filter": {"volume_set": volume_set},
+            "sort": SEARCH_SORT,
+        },
+        {
+            "endpoint": "/api/search (keywords)",
+            "collection": "pages",
+            "filter": {"$and": [trigram_clause(["parliament"]), {"text": {"$regex": "parliament", "$options": "i"}}]},
+            "sort": SEARCH_SORT,
+        },
+        {
+            "endpoint": "/api/search (year)",
+            "collection": "pages",
+            "filter": {"years": {"$in": [1640, 1641, 1642]}},
+            "sort": SEARCH_SORT,
+        },
+        {
+            "endpoint": "/api/search (dates)",
+            "collection": "pages",
+            "filter": {"date_keys": {"$elemMatch": {"$gte": 16400101, "$lte": 16401231}}},
+            "sort": SEARCH_SORT,
+        },
+        {
+            "endpoint": "/api/search (topics)",
+            "collection": "pages",
+            "filter": {"topics": {"$all": ["taxation"]}},
+            "sort": SEARCH_SORT,
+        },
+        {
+            "endpoint": "/api/page/adjacent, /api/page/window",
+            "collection": "pages",
+            "filter": {"volume_id": volume_id},
+            "sort": [("page_number", 1), ("_id", 1)],
+        },
+        {
+            "endpoint": "catalog refresh",
+            "collection": "pages",
+            "filter": {"volume_set": volume_set, "volume_title": sample.get("volume_title", "")},
+            "sort": None,
+        },
+        {
+            "endpoint": "/api/page/passages/all-projects",
+            "collection": "projects",
+            "filter": {"pages": page_id},
+            "sort": None,
+        },
+    ]
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Collect every stage name in an explain() plan tree."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def verify_query_plans() -> List[str]:
+    """
+    Explain each canonical query and report the ones that scan the whole collection
+
+    Returns:
+        The endpoints whose winning plan contains a COLLSCAN
+    """
+    collscans = []
+    for query in canonical_queries():
+        cursor = get_db()[query["collection"]].find(query["filter"]).limit(1)
+        if query["sort"]:
+            cursor = cursor.sort(query["sort"])
+
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = plan_stages(winning_plan)
+
+        if "COLLSCAN" in stages:
+            collscans.append(query["endpoint"])
+            print(f"COLLSCAN  {query['endpoint']}: {' <- '.join(stages)}")
+        else:
+            print(f"ok        {query['endpoint']}: {' <- '.join(stages)}")
+
+    return collscans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Only check query plans, do not create indexes")
+    args = parser.parse_args()
+
+    if not args.check:
+        print(f"Ensured indexes: {ensure_indexes()}")
+
+    collscans = verify_query_plans()
+    if collscans:
+        print(f"{len(collscans)} queries fall back to a collection scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
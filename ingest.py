@@ -0,0 +1,142 @@
+"""
+Page ingestion and maintenance of the derived fields search relies on.
+
+Usage:
+    python ingest.py load pages.json          # insert new pages
+    python ingest.py backfill [--missing-only] [--batch-size N]
+    python ingest.py catalog                  # rebuild the volume catalog
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Iterable, List
+
+from pymongo import UpdateOne
+
+from cache import invalidate_pages
+from catalog import rebuild_catalog, refresh_volumes
+from indexes import ensure_indexes
+from db import get_pages_collection
+from search import date_key, date_keys, extract_years, text_trigrams
+
+# Page fields the derived fields are computed from
+SOURCE_FIELDS = ["text", "volume_title", "dates", "date"]
+
+# Fields written by derived_fields
+DERIVED_FIELDS = ["text_trigrams", "years", "dates_keys", "date_keys"]
+
+
+def derived_fields(page: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute the derived search fields for a page document
+
+    dates_keys holds the parsed OCR "dates"; date_keys adds the curated
+    "date" to them and is what date search and histograms use. Keeping the
+    OCR part separately lets metadata edits recompute date_keys in MongoDB
+    (see projects.page_metadata_pipeline).
+    """
+    ocr_keys = date_keys(page.get("dates"))
+    curated_key = date_key(page.get("date"))
+    return {
+        "text_trigrams": text_trigrams(page.get("text", "")),
+        "years": extract_years(page.get("volume_title", "") or ""),
+        "dates_keys": ocr_keys,
+        "date_keys": sorted(set(ocr_keys) | ({curated_key} if curated_key else set())),
+    }
+
+
+def prepare_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a page document with its derived fields filled in."""
+    prepared = dict(page)
+    prepared.update(derived_fields(page))
+    return prepared
+
+
+def ingest_pages(pages: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Insert new page documents along with their derived fields
+
+    Args:
+        pages: Page documents as produced by the OCR pipeline
+
+    Returns:
+        List of inserted page IDs
+    """
+    prepared = [prepare_page(page) for page in pages]
+    if not prepared:
+        return []
+
+    result = get_pages_collection().insert_many(prepared, ordered=False)
+    print(f"Ingested {len(result.inserted_ids)} pages")
+
+    refresh_volumes((page.get("volume_set"), page.get("volume_title")) for page in prepared)
+    invalidate_pages()
+    return [str(page_id) for page_id in result.inserted_ids]
+
+
+def backfill_derived_fields(batch_size: int = 500, missing_only: bool = False) -> int:
+    """
+    Recompute the derived fields for pages already in the collection
+
+    Args:
+        batch_size: Number of pages written per bulk_write call
+        missing_only: Only touch pages that have never been backfilled
+
+    Returns:
+        Number of pages updated
+    """
+    query = {}
+    if missing_only:
+        query = {"$or": [{field: {"$exists": False}} for field in DERIVED_FIELDS]}
+    projection = {field: 1 for field in SOURCE_FIELDS}
+
+    pages = get_pages_collection()
+
+    updated = 0
+    batch = []
+    for page in pages.find(query, projection, batch_size=batch_size):
+        batch.append(UpdateOne({"_id": page["_id"]}, {"$set": derived_fields(page), "$inc": {"rev": 1}}))
+
+        if len(batch) >= batch_size:
+            updated += pages.bulk_write(batch, ordered=False).modified_count
+            batch = []
+            print(f"Backfilled {updated} pages")
+
+    if batch:
+        updated += pages.bulk_write(batch, ordered=False).modified_count
+
+    if updated:
+        invalidate_pages()
+
+    print(f"Backfill complete: {updated} pages updated")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = subparsers.add_parser("load", help="Insert pages from a JSON file")
+    load_parser.add_argument("path", help="JSON file holding a list of page documents")
+
+    backfill_parser = subparsers.add_parser("backfill", help="Recompute derived fields for existing pages")
+    backfill_parser.add_argument("--batch-size", type=int, default=500)
+    backfill_parser.add_argument("--missing-only", action="store_true")
+
+    subparsers.add_parser("catalog", help="Rebuild the volume catalog from the pages collection")
+
+    args = parser.parse_args()
+
+    print(f"Ensured indexes: {ensure_indexes()}")
+
+    if args.command == "load":
+        with open(args.path) as f:
+            ingest_pages(json.load(f))
+    elif args.command == "backfill":
+        backfill_derived_fields(batch_size=args.batch_size, missing_only=args.missing_only)
+    elif args.command == "catalog":
+        rebuild_catalog()
+
+
+if __name__ == "__main__":
+    main()
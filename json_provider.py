@@ -0,0 +1,52 @@
+"""
+orjson-backed JSON provider for Flask.
+
+Serializes ObjectId and Decimal128 as strings and datetimes as ISO 8601,
+so handlers can return MongoDB documents as they come out of the driver
+instead of converting every "_id" first. Unlike Flask's default provider,
+keys are not sorted and the body is built as bytes in one pass.
+"""
+
+import decimal
+
+import orjson
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def default(obj):
+    """Serialize the BSON and Python types orjson does not handle itself."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (Decimal128, decimal.Decimal)):
+        # As a string, so no precision is lost on the way to the client
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj, default=default, option=OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Make jsonify, request.get_json and friends use orjson."""
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,190 @@
+"""
+Cached per-volume page manifests for reader navigation.
+
+A manifest is the ordered list of (page_number, _id) pairs of one volume.
+Manifests are loaded on first use, kept in a small LRU, and dropped when
+the volume catalog version changes (i.e. when pages are ingested). Once a
+volume is cached, next/previous and read-ahead windows resolve from
+memory and the reader only pays for fetching the pages themselves.
+"""
+
+import bisect
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+from catalog import CATALOG_VERSION
+from db import get_pages_collection
+from versions import get_version
+
+# Number of volume manifests kept in memory per worker
+MANIFEST_CACHE_VOLUMES = int(os.environ.get("MANIFEST_CACHE_VOLUMES", "256"))
+
+_lock = threading.Lock()
+_manifests = OrderedDict()  # volume_id -> [(page_number, ObjectId), ...]
+_page_index = {}  # ObjectId -> (volume_id, position in manifest)
+_volume_order = None  # sorted list of every volume_id
+_version = None
+
+
+def _check_version():
+    """Drop everything cached if the pages behind it may have changed."""
+    global _version, _volume_order
+
+    version = get_version(CATALOG_VERSION)
+    if version != _version:
+        with _lock:
+            _manifests.clear()
+            _page_index.clear()
+            _volume_order = None
+            _version = version
+
+
+def volume_order() -> List[Any]:
+    """Return every volume_id in ascending order."""
+    global _volume_order
+
+    if _volume_order is None:
+        volumes = sorted(v for v in get_pages_collection().distinct("volume_id") if v is not None)
+        with _lock:
+            _volume_order = volumes
+    return _volume_order
+
+
+def get_manifest(volume_id: Any) -> List[Tuple[Any, ObjectId]]:
+    """Return the ordered (page_number, _id) pairs of a volume, loading them if needed."""
+    with _lock:
+        manifest = _manifests.get(volume_id)
+        if manifest is not None:
+            _manifests.move_to_end(volume_id)
+            return manifest
+
+    cursor = get_pages_collection().find(
+        {"volume_id": volume_id}, {"page_number": 1}
+    ).sort([("page_number", 1), ("_id", 1)])
+    # Pages without a page number cannot be placed in the reading order
+    manifest = [
+        (doc["page_number"], doc["_id"])
+        for doc in cursor
+        if doc.get("page_number") is not None
+    ]
+
+    with _lock:
+        _manifests[volume_id] = manifest
+        for position, (_, page_id) in enumerate(manifest):
+            _page_index[page_id] = (volume_id, position)
+
+        # Evict the least recently used volumes
+        while len(_manifests) > MANIFEST_CACHE_VOLUMES:
+            _, evicted = _manifests.popitem(last=False)
+            for _, page_id in evicted:
+                _page_index.pop(page_id, None)
+
+    return manifest
+
+
+def locate(page_id: ObjectId) -> Optional[Tuple[Any, int]]:
+    """Find which volume a page belongs to and its position in that volume's manifest."""
+    _check_version()
+
+    with _lock:
+        location = _page_index.get(page_id)
+    if location:
+        return location
+
+    page = get_pages_collection().find_one({"_id": page_id}, {"volume_id": 1})
+    if not page or page.get("volume_id") is None:
+        return None
+
+    get_manifest(page["volume_id"])
+    with _lock:
+        return _page_index.get(page_id)
+
+
+def _neighbour_volume(volume_id: Any, step: int) -> Optional[Any]:
+    volumes = volume_order()
+    position = bisect.bisect_left(volumes, volume_id)
+    if position < len(volumes) and volumes[position] == volume_id:
+        position += step
+    elif step < 0:
+        position -= 1
+    return volumes[position] if 0 <= position < len(volumes) else None
+
+
+def adjacent_page_id(page_id: ObjectId, direction: str = "next") -> Optional[ObjectId]:
+    """
+    Resolve the page after (or before) a page, crossing into the neighbouring volume at the ends
+
+    Like the original query-based lookup, "next" is the first page with a
+    higher page number in the same volume, and "previous" the last page with
+    a lower one.
+    """
+    location = locate(page_id)
+    if not location:
+        return None
+
+    volume_id, position = location
+    manifest = get_manifest(volume_id)
+    page_numbers = [number for number, _ in manifest]
+    page_number = manifest[position][0]
+
+    if direction == "next":
+        target = bisect.bisect_right(page_numbers, page_number)
+        if target < len(manifest):
+            return manifest[target][1]
+        next_volume = _neighbour_volume(volume_id, 1)
+        if next_volume is not None:
+            next_manifest = get_manifest(next_volume)
+            return next_manifest[0][1] if next_manifest else None
+    else:
+        target = bisect.bisect_left(page_numbers, page_number) - 1
+        if target >= 0:
+            return manifest[target][1]
+        prev_volume = _neighbour_volume(volume_id, -1)
+        if prev_volume is not None:
+            prev_manifest = get_manifest(prev_volume)
+            return prev_manifest[-1][1] if prev_manifest else None
+
+    return None
+
+
+def window_page_ids(page_id: ObjectId, before: int, after: int) -> Tuple[List[ObjectId], int]:
+    """
+    List the page IDs from `before` pages ahead of a page to `after` pages past it
+
+    The window runs on into neighbouring volumes when it reaches either end
+    of the current one.
+
+    Returns:
+        The ordered page IDs and the index of page_id within them
+        (([], -1) if the page is unknown)
+    """
+    location = locate(page_id)
+    if not location:
+        return [], -1
+
+    volume_id, position = location
+    manifest = get_manifest(volume_id)
+
+    preceding = [pid for _, pid in manifest[max(0, position - before) : position]]
+    volume = volume_id
+    while len(preceding) < before:
+        volume = _neighbour_volume(volume, -1)
+        if volume is None:
+            break
+        needed = before - len(preceding)
+        preceding = [pid for _, pid in get_manifest(volume)[-needed:]] + preceding
+
+    following = [pid for _, pid in manifest[position + 1 : position + 1 + after]]
+    volume = volume_id
+    while len(following) < after:
+        volume = _neighbour_volume(volume, 1)
+        if volume is None:
+            break
+        needed = after - len(following)
+        following += [pid for _, pid in get_manifest(volume)[:needed]]
+
+    return preceding + [page_id] + following, len(preceding)
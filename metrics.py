@@ -0,0 +1,192 @@
+"""
+Prometheus metrics for Flask routes and MongoDB commands, served at /metrics.
+
+Recorded per worker:
+    http_request_duration_seconds     latency by method, route and status
+    http_response_size_bytes          body size by method and route (streamed bodies are skipped)
+    mongo_command_duration_seconds    duration by collection, command and outcome
+    mongo_command_documents_total     documents returned or written by collection and command
+    mongo_pool_connections            open and checked-out pooled connections
+    mongo_pool_checkout_failures_total
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory before
+starting it; every worker then writes its samples there and /metrics
+aggregates across all of them (gunicorn.conf.py cleans up after workers
+that exit).
+"""
+
+import os
+import threading
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+from db import add_event_listener
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request",
+    ["method", "route", "status"],
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864),
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "Time spent on a MongoDB command, as seen by the driver",
+    ["collection", "command", "outcome"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+MONGO_DOCUMENTS = Counter(
+    "mongo_command_documents_total",
+    "Documents returned or written by MongoDB commands",
+    ["collection", "command"],
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections",
+    "Pooled MongoDB connections",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Failed attempts to check a connection out of the pool",
+    ["reason"],
+)
+
+
+def _reply_documents(reply):
+    """Count the documents a command returned or affected."""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "n" in reply:
+        return int(reply["n"])
+    if "values" in reply:  # distinct
+        return len(reply["values"])
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command and counts the documents it moves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (connection_id, request_id) -> (collection, command)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = ""
+
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finish(self, event, outcome):
+        with self._lock:
+            collection, command = self._pending.pop(
+                (event.connection_id, event.request_id), ("", event.command_name)
+            )
+        MONGO_COMMAND_LATENCY.labels(collection, command, outcome).observe(event.duration_micros / 1e6)
+        return collection, command
+
+    def succeeded(self, event):
+        collection, command = self._finish(event, "success")
+        documents = _reply_documents(event.reply)
+        if documents:
+            MONGO_DOCUMENTS.labels(collection, command).inc(documents)
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks how many pooled connections are open and in use."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels("open").inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels("open").dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CONNECTIONS.labels("checked_out").inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.labels("checked_out").dec()
+
+
+add_event_listener(CommandMetrics())
+add_event_listener(PoolMetrics())
+
+
+def metrics_payload() -> bytes:
+    """Render every metric in the Prometheus text format, across workers when running multiprocess."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def init_app(app):
+    """Record latency and response size for every route and serve /metrics."""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+            time.perf_counter() - start
+        )
+        if not response.is_streamed:
+            RESPONSE_SIZE.labels(request.method, route).observe(response.calculate_content_length() or 0)
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(metrics_payload(), mimetype=CONTENT_TYPE_LATEST)
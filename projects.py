@@ -1,29 +1,66 @@
-from dotenv import load_dotenv
-
-load_dotenv()
-
 import os
-from pymongo import MongoClient
-import certifi
+import threading
+from collections import OrderedDict
+
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
-ca = certifi.where()
+from cache import invalidate_pages
+from catalog import CATALOG_VERSION
+from db import get_pages_collection, get_projects_collection
+from search import PAGE_PROJECTION, build_search_query, date_key
+from tracing import span
+from versions import get_version
 
-# MongoDB Setup
-MONGO_URI = os.environ["MONGO"]
-client = MongoClient(MONGO_URI, tlsCAFile=ca)
-# db = client["dev"]
-db = client["test"]
 
-projects_collection = db["projects"]
-pages_collection = db["pages"]
+def get_all_projects():
+    return list(get_projects_collection().find())
 
 
-def get_all_projects():
-    projects = list(projects_collection.find())
-    for p in projects:
-        p["_id"] = str(p["_id"])
-    return projects
+def get_page_passages_in_projects(page_id, exclude_project_id=None):
+    """
+    Get the passages saved for a page in every project that contains it
+
+    Uses the multikey index on the projects' "pages" array and projects only
+    this page's passage data, so unrelated projects and pages are never read.
+
+    Args:
+        page_id: ID of the page
+        exclude_project_id: Optional project to leave out (usually the one open in the UI)
+
+    Returns:
+        List of dicts with project_id, project_title, passages and passage_notes
+    """
+    page_id = str(page_id)
+    if not ObjectId.is_valid(page_id):
+        raise ValueError(f"Invalid page ID: {page_id}")
+
+    query = {"pages": page_id}
+    if exclude_project_id and ObjectId.is_valid(str(exclude_project_id)):
+        query["_id"] = {"$ne": ObjectId(str(exclude_project_id))}
+
+    projection = {
+        "title": 1,
+        f"page_metadata.{page_id}.passages": 1,
+        f"page_metadata.{page_id}.passage_notes": 1,
+    }
+
+    projects_with_page = []
+    for project in get_projects_collection().find(query, projection):
+        project_id = str(project["_id"])
+        metadata = (project.get("page_metadata") or {}).get(page_id) or {}
+
+        # Extract passage data only
+        if metadata.get("passages"):
+            projects_with_page.append({
+                "project_id": project_id,
+                "project_title": project.get("title", f"Project {project_id[-6:]}"),
+                "passages": metadata["passages"],
+                "passage_notes": metadata.get("passage_notes", {})
+            })
+
+    return projects_with_page
 
 
 def update_project(data):
@@ -43,38 +80,293 @@ def update_project(data):
         except:
             pass
 
-    result = projects_collection.update_one(
-        {"_id": ObjectId(data["_id"])},  # Filter
-        {"$set": update},  # Update operation
-        upsert=True,  # Insert if not found
-    )
+    # get_project only returns the keywords and metadata of one window of
+    # pages, so a whole-field save built from it would drop every other
+    # page's entries. Only accept dicts covering every page already stored;
+    # single-page changes go through update_project_pages and
+    # update_project_page_metadata.
+    project_filter = {"_id": ObjectId(data["_id"])}
+    complete = []
+    for field in ("page_keywords", "page_metadata"):
+        if field not in update:
+            continue
+        if not isinstance(update[field], dict):
+            raise ValueError(f"{field} must map page IDs to values")
+        stored_ids = {"$map": {"input": {"$objectToArray": {"$ifNull": [f"${field}", {}]}}, "in": "$$this.k"}}
+        complete.append({"$setIsSubset": [stored_ids, list(update[field])]})
+    if complete:
+        project_filter["$expr"] = {"$and": complete}
+
+    try:
+        result = get_projects_collection().update_one(
+            project_filter,  # Filter
+            {"$set": update, "$inc": {"revision": 1}},  # Update operation
+            upsert=True,  # Insert if not found
+        )
+    except DuplicateKeyError:
+        # The project exists, so the upsert means the completeness check failed
+        raise ValueError(
+            "page_keywords and page_metadata must include every page's entry; "
+            "send single-page changes to /api/project/pages/update or /api/project/page/metadata/update"
+        )
 
 
-def get_project(data):
-    p = projects_collection.find_one({"_id": ObjectId(data["_id"])})
+# Most page ids one update_project_pages call may add, remove or move
+MAX_PAGE_DELTA_ITEMS = 5000
+
+
+def _page_id_list(value, name):
+    """Validate a list of page id strings from a delta request."""
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(id_, str) and ObjectId.is_valid(id_) for id_ in value):
+        raise ValueError(f"{name} must be a list of page IDs")
+    if len(value) > MAX_PAGE_DELTA_ITEMS:
+        raise ValueError(f"At most {MAX_PAGE_DELTA_ITEMS} page IDs in {name}")
+    return value
 
-    print(p["pages"])
 
-    object_ids = [ObjectId(id_) for id_ in p["pages"]]
+def move_page_update(page_id, position):
+    """
+    Update pipeline that moves a page already in a project to a new position
+
+    Runs as a single update, so a concurrent add or remove cannot land
+    between taking the page out and putting it back. Pages that are not in
+    the project are left alone.
+    """
+    return [
+        {
+            "$set": {
+                "pages": {
+                    "$let": {
+                        "vars": {"rest": {"$filter": {"input": "$pages", "cond": {"$ne": ["$$this", page_id]}}}},
+                        "in": {
+                            "$cond": [
+                                {"$in": [page_id, "$pages"]},
+                                {
+                                    "$concatArrays": [
+                                        {"$slice": ["$$rest", position]},
+                                        [page_id],
+                                        {"$slice": ["$$rest", position, {"$max": [{"$size": "$$rest"}, 1]}]},
+                                    ]
+                                },
+                                "$pages",
+                            ]
+                        },
+                    }
+                }
+            }
+        }
+    ]
 
-    print(object_ids)
-    docs_cursor = pages_collection.find({"_id": {"$in": object_ids}})
 
-    docs = list(docs_cursor)
+def update_project_pages(project_id, changes):
+    """
+    Apply a change to a project's pages without resending the whole project
+
+    All parts are optional and applied in this order, in one ordered
+    bulk_write against the project document:
+
+        remove    page ids to take out ($pull)
+        add       page ids to append unless already present ($addToSet with $each)
+        move      [{"page_id", "position"}], each moving one page already in the project
+        keywords  {page_id: keywords}, setting one page's keywords (None clears them)
+
+    Args:
+        project_id: ID of the project
+        changes: Dictionary with any of the parts above
+
+    Returns:
+        Dictionary with the project's new "page_count", or None if the project
+        does not exist
+
+    Raises:
+        ValueError: If any part of changes is malformed
+    """
+    if not ObjectId.is_valid(str(project_id)):
+        raise ValueError(f"Invalid project ID: {project_id}")
+    project_filter = {"_id": ObjectId(str(project_id))}
+
+    remove = _page_id_list(changes.get("remove"), "remove")
+    add = _page_id_list(changes.get("add"), "add")
+
+    moves = changes.get("move") or []
+    if not isinstance(moves, list) or len(moves) > MAX_PAGE_DELTA_ITEMS:
+        raise ValueError("move must be a list of {page_id, position}")
+    for move in moves:
+        if (
+            not isinstance(move, dict)
+            or not ObjectId.is_valid(str(move.get("page_id")))
+            or not isinstance(move.get("position"), int)
+            or move["position"] < 0
+        ):
+            raise ValueError("move must be a list of {page_id, position}")
+
+    keywords = changes.get("keywords") or {}
+    if not isinstance(keywords, dict) or len(keywords) > MAX_PAGE_DELTA_ITEMS:
+        raise ValueError("keywords must map page IDs to keywords")
+    for page_id, value in keywords.items():
+        # Page ids become field names, so nothing but an ObjectId may get through
+        if not ObjectId.is_valid(page_id) or not (value is None or isinstance(value, str)):
+            raise ValueError("keywords must map page IDs to keywords")
+
+    operations = []
+    if remove:
+        operations.append(UpdateOne(project_filter, {"$pull": {"pages": {"$in": remove}}}))
+    if add:
+        operations.append(UpdateOne(project_filter, {"$addToSet": {"pages": {"$each": add}}}))
+    for move in moves:
+        operations.append(UpdateOne(project_filter, move_page_update(str(move["page_id"]), move["position"])))
+
+    keyword_update = {}
+    set_keywords = {f"page_keywords.{id_}": value for id_, value in keywords.items() if value is not None}
+    unset_keywords = {f"page_keywords.{id_}": "" for id_, value in keywords.items() if value is None}
+    if set_keywords:
+        keyword_update["$set"] = set_keywords
+    if unset_keywords:
+        keyword_update["$unset"] = unset_keywords
+    if keyword_update:
+        operations.append(UpdateOne(project_filter, keyword_update))
+    if operations:
+        operations.append(UpdateOne(project_filter, {"$inc": {"revision": 1}}))
+
+    projects_collection = get_projects_collection()
+    if operations:
+        projects_collection.bulk_write(operations, ordered=True)
+
+    project = projects_collection.find_one(project_filter, {"page_count": {"$size": {"$ifNull": ["$pages", []]}}})
+    if not project:
+        return None
+
+    return {"page_count": project["page_count"]}
+
+
+# Page summaries returned by get_project per call, unless the caller asks otherwise
+PROJECT_PAGE_LIMIT = 100
+MAX_PROJECT_PAGE_LIMIT = 1000
+
+# Characters of page text included in each page summary
+PAGE_PREVIEW_LENGTH = 40
+
+# "project" keeps the order pages were added to the project;
+# "volume" orders by volume title, then page number
+PROJECT_PAGE_SORTS = ("project", "volume")
+
+
+def page_summary_stages():
+    """Aggregation stages that cut a page down to the fields shown in a project listing."""
+    return [
+        {
+            "$project": {
+                "page_number": 1,
+                "volume_title": 1,
+                "text": {"$substrCP": [{"$ifNull": ["$text", ""]}, 0, PAGE_PREVIEW_LENGTH]},
+                "date": 1,
+                "topics": 1,
+            }
+        }
+    ]
+
+
+def project_window(data):
+    """Read and validate the page_offset, page_limit and page_sort of a project request."""
+    offset = max(0, int(data.get("page_offset") or 0))
+    limit = int(data.get("page_limit") or PROJECT_PAGE_LIMIT)
+    limit = max(1, min(limit, MAX_PROJECT_PAGE_LIMIT))
+    sort = data.get("page_sort") or "project"
+    if sort not in PROJECT_PAGE_SORTS:
+        raise ValueError(f"Invalid page_sort: {sort}")
+    return offset, limit, sort
+
+
+# Project fields left out of get_project; the entries for the requested
+# window are read separately with page_annotations_projection
+PROJECT_WINDOW_PROJECTION = {"page_keywords": 0, "page_metadata": 0}
+
+# Projects whose "volume" page order each worker keeps in memory
+PROJECT_ORDER_CACHE_SIZE = int(os.environ.get("PROJECT_ORDER_CACHE_SIZE", "64"))
+
+_order_lock = threading.Lock()
+_volume_orders = OrderedDict()  # project _id -> (revision, catalog version, [ObjectId, ...])
+
+
+def project_volume_order(p):
+    """
+    Return a project's page ids ordered by volume title, then page number
+
+    The order is sorted once per project revision and kept in a small LRU,
+    so paging through a large project in volume order only fetches each
+    window. Ingestion (the catalog version) also retires cached orders, as
+    it may add pages or change their titles.
+    """
+    key = (p.get("revision", 0), get_version(CATALOG_VERSION))
+    with _order_lock:
+        cached = _volume_orders.get(p["_id"])
+        if cached is not None and cached[:2] == key:
+            _volume_orders.move_to_end(p["_id"])
+            return cached[2]
+
+    object_ids = [ObjectId(id_) for id_ in p.get("pages", [])]
+    cursor = get_pages_collection().find(
+        {"_id": {"$in": object_ids}}, {"volume_title": 1, "page_number": 1}
+    ).sort([("volume_title", 1), ("page_number", 1), ("_id", 1)])
+    order = [doc["_id"] for doc in cursor]
+
+    with _order_lock:
+        _volume_orders[p["_id"]] = key + (order,)
+        _volume_orders.move_to_end(p["_id"])
+        while len(_volume_orders) > PROJECT_ORDER_CACHE_SIZE:
+            _volume_orders.popitem(last=False)
+    return order
+
+
+def project_window_ids(p, offset, limit, sort):
+    """The ObjectIds of the pages in one window of a project, in display order."""
+    if sort == "project":
+        # The project's own list gives the order
+        return [ObjectId(id_) for id_ in p.get("pages", [])[offset : offset + limit]]
+    return project_volume_order(p)[offset : offset + limit]
+
+
+def project_pages_pipeline(window_ids):
+    """Aggregation for the page summaries of one window of a project."""
+    return [{"$match": {"_id": {"$in": window_ids}}}] + page_summary_stages()
+
+
+def page_annotations_projection(window_ids):
+    """Projection reading a project's keywords and metadata for just these pages."""
+    projection = {"_id": 0}
+    for id_ in window_ids:
+        projection[f"page_keywords.{id_}"] = 1
+        projection[f"page_metadata.{id_}"] = 1
+    return projection
+
+
+def add_page_docs(p, docs, window_ids, offset, limit, annotations):
+    """
+    Attach a window of page summaries, with their keywords and metadata, to a project
+
+    Args:
+        p: Project as read with PROJECT_WINDOW_PROJECTION
+        annotations: page_keywords and page_metadata entries for the window,
+                     as read with page_annotations_projection
+    """
+    by_id = {doc["_id"]: doc for doc in docs}
+    docs = [by_id[id_] for id_ in window_ids if id_ in by_id]
 
     # Add keywords to the page docs if available
-    page_keywords = p.get("page_keywords", {})
-    
+    page_keywords = (annotations or {}).get("page_keywords", {})
+
     # Add project-specific page metadata if available
-    page_metadata = p.get("page_metadata", {})
+    page_metadata = (annotations or {}).get("page_metadata", {})
 
     p["page_docs"] = list(
         map(
             lambda doc: {
-                "_id": str(doc["_id"]),
+                "_id": doc["_id"],
                 "page_number": str(doc["page_number"]),
                 "volume_title": str(doc["volume_title"]),
-                "text": doc["text"][:40],
+                "text": doc["text"],
                 "keywords": page_keywords.get(str(doc["_id"]), ""),
                 # Include universal metadata from the page document
                 "date": doc.get("date", None),
@@ -86,14 +378,53 @@ def get_project(data):
         )
     )
 
-    p["_id"] = str(p["_id"])
+    page_count = len(p.get("pages", []))
+    p["page_docs_total"] = page_count
+    p["page_offset"] = offset
+    p["page_limit"] = limit
+    p["next_page_offset"] = offset + limit if offset + limit < page_count else None
 
     return p
 
 
-# added create project
+def get_project(data):
+    """
+    Get a project with one page of its page summaries
+
+    The summaries are built in MongoDB, which truncates the text to
+    PAGE_PREVIEW_LENGTH characters. Only page_limit of them are fetched per
+    call, along with the keywords and metadata of those pages alone, and
+    the "volume" order is cached per project revision (project_volume_order),
+    so opening or paging through a project costs the same whatever its size.
+
+    Args:
+        data: Dictionary with the project "_id" and optional page_offset,
+              page_limit and page_sort ("project" or "volume")
+
+    Returns:
+        The project document with its page ids but without page_keywords
+        and page_metadata, plus "page_docs" for the requested window,
+        page_docs_total and next_page_offset (None on the last window)
+    """
+    offset, limit, sort = project_window(data)
+
+    projects_collection = get_projects_collection()
+    p = projects_collection.find_one({"_id": ObjectId(data["_id"])}, PROJECT_WINDOW_PROJECTION)
+    if not p:
+        return None
+
+    window_ids = project_window_ids(p, offset, limit, sort)
+    docs = list(get_pages_collection().aggregate(project_pages_pipeline(window_ids)))
+
+    annotations = None
+    if window_ids:
+        annotations = projects_collection.find_one({"_id": p["_id"]}, page_annotations_projection(window_ids))
+
+    return add_page_docs(p, docs, window_ids, offset, limit, annotations)
+
+
 def create_project():
-    doc = projects_collection.insert_one({
+    doc = get_projects_collection().insert_one({
         "title": "", 
         "description": "", 
         "pages": [], 
@@ -112,15 +443,63 @@ def create_project():
 
 # added delete project
 def delete_project(project_id: str) -> bool:
-    result = projects_collection.delete_one({"_id": ObjectId(project_id)})
+    result = get_projects_collection().delete_one({"_id": ObjectId(project_id)})
     return result.deleted_count == 1
 
 
 def get_page(data):
-    print(data)
-    p = pages_collection.find_one({"_id": ObjectId(data["_id"])})
-    p["_id"] = str(p["_id"])
-    return p
+    return get_pages_collection().find_one({"_id": ObjectId(data["_id"])}, PAGE_PROJECTION)
+
+
+def page_metadata_update(metadata):
+    """
+    Validate universal page metadata and build the $set for it
+
+    Args:
+        metadata: Dictionary with "date" (a string, or None to clear it)
+                  and/or "topics" (a list of strings)
+
+    Returns:
+        The fields to $set; empty when metadata has neither key
+
+    Raises:
+        ValueError: If metadata is not a dictionary or a value has the wrong type
+    """
+    if not isinstance(metadata, dict):
+        raise ValueError("Metadata must be an object")
+
+    update = {}
+
+    if "date" in metadata:
+        if metadata["date"] is not None and not isinstance(metadata["date"], str):
+            raise ValueError("date must be a string or null")
+        update["date"] = metadata["date"]
+
+    if "topics" in metadata:
+        topics = metadata["topics"]
+        if not isinstance(topics, list) or not all(isinstance(topic, str) for topic in topics):
+            raise ValueError("topics must be a list of strings")
+        update["topics"] = topics
+
+    return update
+
+
+def page_metadata_pipeline(update):
+    """
+    Update pipeline that applies a page_metadata_update and keeps the derived fields current
+
+    Bumps the page's "rev" and, when the date changes, rebuilds date_keys
+    from the stored OCR dates_keys plus the new curated date.
+    """
+    # $literal so that user text starting with "$" is never read as a field path
+    fields = {field: {"$literal": value} for field, value in update.items()}
+    fields["rev"] = {"$add": [{"$ifNull": ["$rev", 0]}, 1]}
+
+    if "date" in update:
+        key = date_key(update["date"])
+        fields["date_keys"] = {"$setUnion": [{"$ifNull": ["$dates_keys", []]}, [key] if key else []]}
+
+    return [{"$set": fields}]
 
 
 # Add function to update universal page metadata
@@ -136,32 +515,158 @@ def update_page_metadata(page_id, metadata):
         True if successful, False otherwise
     """
     try:
-        update = {}
-        
-        if "date" in metadata:
-            update["date"] = metadata["date"]
-            
-        if "topics" in metadata:
-            update["topics"] = metadata["topics"]
-        
+        update = page_metadata_update(metadata)
         if not update:
             return False
             
-        result = pages_collection.update_one(
+        result = get_pages_collection().update_one(
             {"_id": ObjectId(page_id)},
-            {"$set": update}
+            page_metadata_pipeline(update)
         )
-        
+
+        # Date and topics are search filters, so cached searches are now stale
+        if result.modified_count:
+            invalidate_pages()
+
         return result.modified_count > 0
     except Exception as e:
         print(f"Error updating page metadata: {e}")
         return False
 
 
+# Most items one bulk metadata update may carry
+MAX_BULK_METADATA_ITEMS = 1000
+
+# Search filters that narrow a filtered bulk update; volume_set alone is too broad
+BULK_FILTER_KEYS = ("volume", "page_numbers", "dates", "topics", "keywords", "year")
+
+
+def bulk_update_page_metadata(items):
+    """
+    Update universal metadata (date, topics) for many pages in one bulk_write
+
+    Items that fail validation or name a page that does not exist are
+    reported and skipped; the rest are sent as one unordered bulk_write.
+
+    Args:
+        items: List of {"page_id", "metadata"} dicts (at most MAX_BULK_METADATA_ITEMS)
+
+    Returns:
+        Dictionary with matched_count, modified_count and "results": one
+        {"page_id", "status", "error"?} per item, in order. status is
+        "updated", "invalid", "not_found" or "failed".
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("No items provided")
+    if len(items) > MAX_BULK_METADATA_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_METADATA_ITEMS} items per request")
+
+    results = []
+    updates = []  # (index into results, page ObjectId, fields to $set)
+    for item in items:
+        page_id = item.get("page_id") if isinstance(item, dict) else None
+        result = {"page_id": page_id, "status": "updated"}
+        results.append(result)
+        try:
+            if not isinstance(page_id, str) or not ObjectId.is_valid(page_id):
+                raise ValueError(f"Invalid page ID: {page_id}")
+            update = page_metadata_update(item.get("metadata"))
+            if not update:
+                raise ValueError("Metadata must contain date and/or topics")
+        except ValueError as e:
+            result["status"] = "invalid"
+            result["error"] = str(e)
+            continue
+        updates.append((len(results) - 1, ObjectId(page_id), update))
+
+    pages_collection = get_pages_collection()
+
+    # bulk_write only reports totals, so look up which pages exist first
+    ids = [object_id for _, object_id, _ in updates]
+    existing = {doc["_id"] for doc in pages_collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+    for index, object_id, _ in updates:
+        if object_id not in existing:
+            results[index]["status"] = "not_found"
+    updates = [update for update in updates if update[1] in existing]
+
+    matched = modified = 0
+    if updates:
+        operations = [
+            UpdateOne({"_id": object_id}, page_metadata_pipeline(update)) for _, object_id, update in updates
+        ]
+        try:
+            write = pages_collection.bulk_write(operations, ordered=False)
+            matched, modified = write.matched_count, write.modified_count
+        except BulkWriteError as e:
+            matched, modified = e.details.get("nMatched", 0), e.details.get("nModified", 0)
+            for error in e.details.get("writeErrors", []):
+                result = results[updates[error["index"]][0]]
+                result["status"] = "failed"
+                result["error"] = error.get("errmsg", "Write failed")
+
+    if modified:
+        invalidate_pages()
+
+    return {"matched_count": matched, "modified_count": modified, "results": results}
+
+
+def bulk_update_page_metadata_by_filter(filters, metadata):
+    """
+    Apply one metadata patch to every page matching a set of search filters
+
+    Args:
+        filters: search_journals arguments; at least one of BULK_FILTER_KEYS
+                 must narrow the query, and volume_set defaults to
+                 "parliamentary proceedings" as in search_journals
+        metadata: Dictionary with date and/or topics, validated like a
+                  single-page update
+
+    Returns:
+        Dictionary with matched_count and modified_count
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("Filter must be an object of search filters")
+    # An ignored key would widen the update to pages the caller never meant
+    unknown = set(filters) - set(BULK_FILTER_KEYS + ("volume_set",))
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+    # build_search_query skips page numbers it cannot parse; here that would widen the update
+    for page_number in filters.get("page_numbers") or []:
+        try:
+            int(page_number)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid page number: {page_number!r}")
+
+    update = page_metadata_update(metadata)
+    if not update:
+        raise ValueError("Metadata must contain date and/or topics")
+
+    query = build_search_query(
+        **{key: filters.get(key) for key in BULK_FILTER_KEYS},
+        volume_set=filters.get("volume_set") or "parliamentary proceedings",
+    )
+    if query is None:
+        return {"matched_count": 0, "modified_count": 0}
+    # Check the query actually built, since empty filter values are dropped on the way
+    if not set(query) - {"volume_set"}:
+        raise ValueError(f"Filter must include at least one of: {', '.join(BULK_FILTER_KEYS)}")
+
+    write = get_pages_collection().bulk_write([UpdateMany(query, page_metadata_pipeline(update))], ordered=False)
+    if write.modified_count:
+        invalidate_pages()
+
+    return {"matched_count": write.matched_count, "modified_count": write.modified_count}
+
+
 # Add function to update project-specific page metadata
 def update_project_page_metadata(project_id, page_id, metadata):
     """
     Update project-specific metadata for a page (passages, notes)
+
+    Only the fields present in metadata are written, each with its own
+    dotted-path $set (page_metadata.<page_id>.<field>), in a single atomic
+    update without reading the project first. Concurrent edits to other
+    pages or other fields are never overwritten.
     
     Args:
         project_id: ID of the project
@@ -169,37 +674,28 @@ def update_project_page_metadata(project_id, page_id, metadata):
         metadata: Dictionary containing passages, page_notes, and/or passage_notes
     
     Returns:
-        True if successful, False otherwise
+        The page's updated metadata sub-document, or None on failure
     """
     try:
         # Validate inputs
         if not project_id or not page_id or not metadata:
             print(f"Invalid input: project_id={project_id}, page_id={page_id}, has_metadata={metadata is not None}")
-            return False
+            return None
             
         # Convert IDs to strings if they're not already
         project_id = str(project_id)
         page_id = str(page_id)
+
+        # The page ID becomes part of a field path, so it must be a plain ObjectId string
+        if not ObjectId.is_valid(project_id) or not ObjectId.is_valid(page_id):
+            print(f"Invalid ID: project_id={project_id}, page_id={page_id}")
+            return None
         
         print(f"Updating metadata for project {project_id}, page {page_id}")
         
-        # First get the current project
-        project = projects_collection.find_one({"_id": ObjectId(project_id)})
-        if not project:
-            print(f"Project not found with ID: {project_id}")
-            return False
-            
-        # Get or initialize page_metadata (ensure it's a dictionary)
-        page_metadata = project.get("page_metadata", {})
-        if not isinstance(page_metadata, dict):
-            page_metadata = {}
-            
-        # Get or initialize metadata for this specific page (ensure it's a dictionary)
-        page_specific_metadata = page_metadata.get(page_id, {})
-        if not isinstance(page_specific_metadata, dict):
-            page_specific_metadata = {}
+        # Fields to set for this page, preserving any other existing metadata
+        page_specific_metadata = {}
         
-        # Update with new metadata, preserving existing metadata
         if "passages" in metadata:
             try:
                 # Ensure passages is a list
@@ -271,30 +767,79 @@ def update_project_page_metadata(project_id, page_id, metadata):
                 traceback.print_exc()
                 page_specific_metadata["passage_notes"] = {}
         
-        # Update the metadata for this page
-        page_metadata[page_id] = page_specific_metadata
+        field_path = f"page_metadata.{page_id}"
+        update = {
+            f"{field_path}.{field}": value
+            for field, value in page_specific_metadata.items()
+        }
         
-        # Update the project with the new metadata
+        # Update just these fields of this page's metadata
         try:
-            result = projects_collection.update_one(
-                {"_id": ObjectId(project_id)},
-                {"$set": {"page_metadata": page_metadata}}
-            )
-            success = result.modified_count > 0 or result.matched_count > 0
-            print(f"Update result: modified={result.modified_count}, matched={result.matched_count}, success={success}")
-            return success
+            if update:
+                project = get_projects_collection().find_one_and_update(
+                    {"_id": ObjectId(project_id)},
+                    {"$set": update, "$inc": {"revision": 1}},
+                    projection={field_path: 1},
+                    return_document=ReturnDocument.AFTER,
+                )
+            else:
+                # Nothing recognised to change; report the current metadata
+                project = get_projects_collection().find_one(
+                    {"_id": ObjectId(project_id)}, {field_path: 1}
+                )
+            if not project:
+                print(f"Project not found with ID: {project_id}")
+                return None
+
+            return (project.get("page_metadata") or {}).get(page_id, {})
         except Exception as e:
             print(f"Error updating project document: {e}")
             import traceback
             traceback.print_exc()
-            return False
+            return None
             
     except Exception as e:
         print(f"Error updating project page metadata: {e}")
         # Print more detailed error info for debugging
         import traceback
         traceback.print_exc()
-        return False
+        return None
+
+
+def export_page_data(page, page_keywords, page_metadata):
+    """Combine a page document with its project keywords and metadata into one export record."""
+    page_id = str(page["_id"])
+
+    # Get page metadata (both universal and project-specific)
+    metadata = {
+        "page_id": page_id,
+        "volume_title": page.get("volume_title", ""),
+        "page_number": str(page.get("page_number", "")),
+        "date": page.get("date", ""),
+        "topics": page.get("topics", []),
+        "text": page.get("text", ""),
+        "keywords": page_keywords.get(page_id, ""),
+        "volume_set": page.get("volume_set", ""),
+    }
+
+    # Add project-specific metadata if available
+    if page_id in page_metadata:
+        project_meta = page_metadata[page_id]
+        metadata["page_notes"] = project_meta.get("page_notes", "")
+        metadata["passages"] = project_meta.get("passages", [])
+        metadata["passage_notes"] = project_meta.get("passage_notes", {})
+    else:
+        metadata["page_notes"] = ""
+        metadata["passages"] = []
+        metadata["passage_notes"] = {}
+
+    return metadata
+
+
+def export_sort_key(page):
+    """Order export rows by volume title, then numeric page number."""
+    page_number = str(page.get("page_number", ""))
+    return (page.get("volume_title", "") or "", int(page_number) if page_number.isdigit() else 0)
 
 
 def get_project_data_for_export(project_id):
@@ -308,10 +853,8 @@ def get_project_data_for_export(project_id):
         Dictionary with project and page data including all metadata
     """
     try:
-        print(f"Retrieving project data for export, project_id: {project_id}")
-        
         # Get the project document
-        project = projects_collection.find_one({"_id": ObjectId(project_id)})
+        project = get_projects_collection().find_one({"_id": ObjectId(project_id)})
         if not project:
             print(f"Project not found with ID: {project_id}")
             return None
@@ -323,11 +866,10 @@ def get_project_data_for_export(project_id):
             return {"project_title": project.get("title", ""), "project_description": project.get("description", ""), "pages": []}
             
         # Convert page IDs to ObjectIds
-        print(f"Found {len(page_ids)} pages in project")
         object_ids = [ObjectId(id_) for id_ in page_ids]
         
         # Get all page documents
-        pages = list(pages_collection.find({"_id": {"$in": object_ids}}))
+        pages = list(get_pages_collection().find({"_id": {"$in": object_ids}}, PAGE_PROJECTION))
         
         # Verify we found all pages
         if len(pages) != len(page_ids):
@@ -338,39 +880,10 @@ def get_project_data_for_export(project_id):
         page_metadata = project.get("page_metadata", {})
         
         # Prepare data structure for export
-        export_data = []
-        for page in pages:
-            page_id = str(page["_id"])
-            
-            # Get page metadata (both universal and project-specific)
-            metadata = {
-                "page_id": page_id,
-                "volume_title": page.get("volume_title", ""),
-                "page_number": str(page.get("page_number", "")),
-                "date": page.get("date", ""),
-                "topics": page.get("topics", []),
-                "text": page.get("text", ""),
-                "keywords": page_keywords.get(page_id, ""),
-                "volume_set": page.get("volume_set", ""),
-            }
-            
-            # Add project-specific metadata if available
-            if page_id in page_metadata:
-                project_meta = page_metadata[page_id]
-                metadata["page_notes"] = project_meta.get("page_notes", "")
-                metadata["passages"] = project_meta.get("passages", [])
-                metadata["passage_notes"] = project_meta.get("passage_notes", {})
-            else:
-                metadata["page_notes"] = ""
-                metadata["passages"] = []
-                metadata["passage_notes"] = {}
-            
-            export_data.append(metadata)
+        export_data = [export_page_data(page, page_keywords, page_metadata) for page in pages]
             
         # Sort by volume_title and page_number
-        export_data.sort(key=lambda x: (x["volume_title"], int(x["page_number"]) if x["page_number"].isdigit() else 0))
-        
-        print(f"Successfully prepared export data with {len(export_data)} pages")
+        export_data.sort(key=export_sort_key)
         
         return {
             "project_title": project.get("title", ""),
@@ -384,3 +897,74 @@ def get_project_data_for_export(project_id):
         import traceback
         traceback.print_exc()
         return None
+
+
+# Number of full page documents fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 200
+
+
+def get_project_export_stream(project_id):
+    """
+    Get project data for a streaming CSV export without loading every page's text at once
+
+    The column count (max_passages) is worked out from the project document
+    alone. Page order is settled with a projected query that leaves out the
+    text, and full pages are then fetched EXPORT_BATCH_SIZE at a time as the
+    "pages" generator is consumed.
+
+    Args:
+        project_id: ID of the project
+
+    Returns:
+        Dictionary with project_title, project_description, max_passages and a
+        "pages" generator of export records, or None if the project is not found
+    """
+    project = get_projects_collection().find_one(
+        {"_id": ObjectId(project_id)},
+        {"title": 1, "description": 1, "pages": 1, "page_keywords": 1, "page_metadata": 1},
+    )
+    if not project:
+        print(f"Project not found with ID: {project_id}")
+        return None
+
+    page_ids = project.get("pages", []) or []
+    page_keywords = project.get("page_keywords", {}) or {}
+    page_metadata = project.get("page_metadata", {}) or {}
+
+    max_passages = 0
+    for page_id in page_ids:
+        passages = (page_metadata.get(page_id) or {}).get("passages") or []
+        max_passages = max(max_passages, len(passages))
+
+    def pages():
+        pages_collection = get_pages_collection()
+        object_ids = [ObjectId(id_) for id_ in page_ids]
+
+        # Sort keys only; the text is fetched batch by batch below
+        with span("fetch page order", pages=len(object_ids)):
+            keys = list(
+                pages_collection.find(
+                    {"_id": {"$in": object_ids}},
+                    {"volume_title": 1, "page_number": 1},
+                )
+            )
+        keys.sort(key=export_sort_key)
+        ordered_ids = [key["_id"] for key in keys]
+
+        for start in range(0, len(ordered_ids), EXPORT_BATCH_SIZE):
+            batch_ids = ordered_ids[start : start + EXPORT_BATCH_SIZE]
+            with span("fetch pages", pages=len(batch_ids)):
+                batch = {
+                    page["_id"]: page
+                    for page in pages_collection.find({"_id": {"$in": batch_ids}}, PAGE_PROJECTION)
+                }
+            for page_id in batch_ids:
+                if page_id in batch:
+                    yield export_page_data(batch[page_id], page_keywords, page_metadata)
+
+    return {
+        "project_title": project.get("title", ""),
+        "project_description": project.get("description", ""),
+        "max_passages": max_passages,
+        "pages": pages(),
+    }
@@ -0,0 +1,276 @@
+"""
+Request tracing with nested spans, written out as structured JSON lines.
+
+Each Flask request gets a root span named after its route. Code marks
+logical steps with `with span("fetch pages"):`, and every MongoDB command
+becomes a child span of whatever span is current when it is issued.
+
+Tracing is off unless one of these is set:
+    TRACE_FILE       append one JSON object per finished span to this file
+    TRACE_ENDPOINT   POST batches of spans as {"spans": [...]} JSON to this
+                     URL (an OTLP-style collector stand-in)
+"""
+
+import contextvars
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from flask import g, request
+from pymongo import monitoring
+
+from db import add_event_listener
+
+TRACE_FILE = os.environ.get("TRACE_FILE")
+TRACE_ENDPOINT = os.environ.get("TRACE_ENDPOINT")
+
+# Spans per HTTP export batch, and the longest a span waits to be sent
+EXPORT_BATCH_SIZE = 100
+EXPORT_INTERVAL_SECONDS = 1.0
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed step of a trace."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _export(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class FileExporter:
+    """Appends finished spans to a file as JSON lines."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1)
+
+    def export(self, span: Dict[str, Any]) -> None:
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+class HttpExporter:
+    """Sends finished spans to a collector in batches from a background thread."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._queue = queue.Queue(maxsize=10000)
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass  # Drop spans rather than slow down requests
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch) -> None:
+        body = json.dumps({"spans": batch}, default=str).encode("utf-8")
+        req = urllib.request.Request(
+            self.endpoint, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            urllib.request.urlopen(req, timeout=5).close()
+        except Exception as e:
+            print(f"Error exporting {len(batch)} spans: {e}")
+
+
+_exporters = []
+if TRACE_FILE:
+    _exporters.append(FileExporter(TRACE_FILE))
+if TRACE_ENDPOINT:
+    _exporters.append(HttpExporter(TRACE_ENDPOINT))
+
+
+def _export(span: Dict[str, Any]) -> None:
+    for exporter in _exporters:
+        exporter.export(span)
+
+
+def enabled() -> bool:
+    return bool(_exporters)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block of code as a child of the current span.
+
+    Yields the Span (or None when tracing is off) so callers can attach
+    attributes they only know once the work is done.
+    """
+    if not _exporters:
+        yield None
+        return
+
+    child = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Attach an attribute to the current span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+class CommandSpans(monitoring.CommandListener):
+    """Records each MongoDB command as a child span of the span that issued it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (connection_id, request_id) -> Span
+
+    def started(self, event):
+        parent = _current_span.get()
+        if parent is None:
+            return
+
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+
+        child = Span(
+            f"mongo {event.command_name}",
+            parent,
+            {
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.collection": collection if isinstance(collection, str) else "",
+            },
+        )
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = child
+
+    def _pop(self, event) -> Optional[Span]:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        child = self._pop(event)
+        if child is None:
+            return
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict):
+            child.set_attribute("db.documents", len(cursor.get("firstBatch", cursor.get("nextBatch", []))))
+        elif "n" in event.reply:
+            child.set_attribute("db.documents", event.reply["n"])
+        child.end()
+
+    def failed(self, event):
+        child = self._pop(event)
+        if child is None:
+            return
+        child.status = "error"
+        child.set_attribute("error", str(event.failure))
+        child.end()
+
+
+if _exporters:
+    add_event_listener(CommandSpans())
+
+
+def init_app(app):
+    """Open a root span for every request and close it once the response is finished."""
+    if not _exporters:
+        return
+
+    @app.before_request
+    def start_trace():
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        root = Span(
+            f"{request.method} {route}",
+            None,
+            {"http.method": request.method, "http.route": route, "http.target": request.path},
+        )
+        g.trace_span = root
+        g.trace_token = _current_span.set(root)
+
+    @app.after_request
+    def record_status(response):
+        root = g.get("trace_span")
+        if root is not None:
+            root.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                root.status = "error"
+        return response
+
+    @app.teardown_request
+    def end_trace(error=None):
+        root = g.pop("trace_span", None)
+        token = g.pop("trace_token", None)
+        if root is None:
+            return
+        if error is not None:
+            root.set_error(error)
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                pass  # Teardown ran in a different context than before_request
+        root.end()
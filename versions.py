@@ -0,0 +1,58 @@
+"""
+Version counters shared by every worker through the "meta" collection.
+
+Writers bump a counter when the data behind an in-process cache changes;
+readers poll it at most every VERSION_CHECK_SECONDS and rebuild their
+cache when the number moves.
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from db import get_collection
+
+VERSION_CHECK_SECONDS = float(os.environ.get("VERSION_CHECK_SECONDS", "5"))
+
+_lock = threading.Lock()
+_versions = {}  # name -> (version, monotonic time it was read)
+
+
+def get_version(name: str, max_age: float = VERSION_CHECK_SECONDS) -> int:
+    """Return the current value of a version counter, polling at most every max_age seconds."""
+    now = time.monotonic()
+    with _lock:
+        cached = _versions.get(name)
+    if cached and now - cached[1] < max_age:
+        return cached[0]
+
+    doc = get_collection("meta").find_one({"_id": name}, {"version": 1})
+    version = doc.get("version", 0) if doc else 0
+
+    with _lock:
+        _versions[name] = (version, now)
+    return version
+
+
+def last_version(name: str) -> Optional[int]:
+    """Return the value of a counter as last read or bumped by this worker, without polling."""
+    with _lock:
+        cached = _versions.get(name)
+    return cached[0] if cached else None
+
+
+def bump_version(name: str) -> int:
+    """Increment a version counter and return the new value."""
+    doc = get_collection("meta").find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    with _lock:
+        _versions[name] = (doc["version"], time.monotonic())
+    return doc["version"]